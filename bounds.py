@@ -0,0 +1,223 @@
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+
+from resource_decoder import assign_resources, schedule_error
+from symmetry import compulsory_clique
+
+# Instance bounds shared by the es3 drivers, computed before any encoding.
+
+# Suite totals of the preemptive flow filter, reported by the drivers after each input folder
+flow_filter_stats = {'runs': 0, 'caught': 0, 'time': 0.0}
+
+def window_clique(tasks):
+    # Most task windows [r, d) covering a single time point. Every task runs inside its
+    # window, so no schedule has more tasks running at once, and interval graphs can be
+    # coloured with their clique number: this many resources always suffice
+    events = []
+    for r, e, d in tasks:
+        events.append((r, 1))
+        events.append((d, -1))
+
+    # Windows are half-open, so at equal times the ends come before the starts
+    best, active = 0, 0
+    for point, delta in sorted(events):
+        active += delta
+        best = max(best, active)
+    return best
+
+def edf_schedule(tasks, resources):
+    # Greedy non-preemptive EDF list scheduling: whenever a resource is idle, start the released
+    # task with the earliest deadline. O(n log n). Returns (starts, task_resource), or None
+    # as soon as a task misses its deadline (which proves nothing about the instance)
+    order = sorted(range(len(tasks)), key=lambda i: tasks[i][0])
+    machines = [(0, j) for j in range(resources)]
+    ready = []
+    starts = [None] * len(tasks)
+    task_resource = [None] * len(tasks)
+
+    k, t = 0, 0
+    while k < len(tasks) or ready:
+        # Next decision point: a resource is idle and some task is released
+        t = max(t, machines[0][0])
+        if not ready:
+            t = max(t, tasks[order[k]][0])
+        while k < len(tasks) and tasks[order[k]][0] <= t:
+            i = order[k]
+            heapq.heappush(ready, (tasks[i][2], i))
+            k += 1
+
+        d, i = heapq.heappop(ready)
+        if t + tasks[i][1] > d:
+            return None
+        _, j = heapq.heappop(machines)
+        starts[i], task_resource[i] = t, j
+        heapq.heappush(machines, (t + tasks[i][1], j))
+
+    return starts, task_resource
+
+def ramp_sums(points, xs):
+    # sum over x in xs of max(point - x, 0), for every point, with xs sorted
+    count = np.searchsorted(xs, points, side='right')
+    prefix = np.concatenate([[0], np.cumsum(xs)])
+    return count * points - prefix[count]
+
+def energy_certificate(tasks, resources):
+    # Energetic reasoning: wherever a task starts, it spends at least
+    # min(e, b - a, r + e - a, b - d + e) steps inside [a, b). When these minimum energies
+    # exceed resources * (b - a) the instance is infeasible. Windows run over a in {r, d - e}
+    # and b in {d, r + e}. For a fixed a the minimum energy of a task is a ramp in b, rising
+    # from 0 at max(a, d - e) by one per step up to min(r + e - max(a, r), d - max(a, d - e)),
+    # so the energies of all b come from sorted ramp sums in O(n log n) per a.
+    # Returns the most violated (a, b, energy) as a certificate, or None
+    r = np.array([task[0] for task in tasks])
+    e = np.array([task[1] for task in tasks])
+    d = np.array([task[2] for task in tasks])
+    ends = np.unique(np.concatenate([d, r + e]))
+
+    certificate, excess = None, 0
+    for a in np.unique(np.concatenate([r, d - e])):
+        b = ends[ends > a]
+        rise = np.maximum(a, d - e)
+        height = np.minimum(r + e - np.maximum(a, r), d - rise)
+        rise, height = rise[height > 0], height[height > 0]
+        energy = ramp_sums(b, np.sort(rise)) - ramp_sums(b, np.sort(rise + height))
+        over = energy - resources * (b - a)
+        if len(over) and over.max() > excess:
+            k = int(over.argmax())
+            certificate, excess = (int(a), int(b[k]), int(energy[k])), over[k]
+    return certificate
+
+def max_flow(nodes, edges, source, sink):
+    # Dinic's algorithm on (u, v, capacity) edges. Residual edges are stored in flat
+    # lists, the reverse of edge k is k ^ 1
+    head = [[] for _ in range(nodes)]
+    to, cap = [], []
+    for u, v, c in edges:
+        head[u].append(len(to))
+        to.append(v)
+        cap.append(c)
+        head[v].append(len(to))
+        to.append(u)
+        cap.append(0)
+
+    flow = 0
+    while True:
+        # BFS levels from the source in the residual graph
+        level = [-1] * nodes
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for k in head[u]:
+                if cap[k] > 0 and level[to[k]] < 0:
+                    level[to[k]] = level[u] + 1
+                    queue.append(to[k])
+        if level[sink] < 0:
+            return flow
+
+        # Blocking flow with an iterative DFS, it[u] skips edges that are already saturated
+        it = [0] * nodes
+        while True:
+            path, u = [], source
+            while u != sink:
+                while it[u] < len(head[u]):
+                    k = head[u][it[u]]
+                    if cap[k] > 0 and level[to[k]] == level[u] + 1:
+                        break
+                    it[u] += 1
+                if it[u] == len(head[u]):
+                    # Dead end: retreat one step
+                    if not path:
+                        break
+                    level[u] = -1
+                    u = to[path.pop() ^ 1]
+                    continue
+                k = head[u][it[u]]
+                path.append(k)
+                u = to[k]
+            if u != sink:
+                break
+            pushed = min(cap[k] for k in path)
+            for k in path:
+                cap[k] -= pushed
+                cap[k ^ 1] += pushed
+            flow += pushed
+
+def preemptive_feasible(tasks, resources, record_stats=True):
+    # Horn's construction for the preemptive relaxation: source -> task i (capacity e_i),
+    # task i -> elementary interval [t_k, t_k+1) inside its window (capacity t_k+1 - t_k),
+    # interval -> sink (capacity resources * (t_k+1 - t_k)). The relaxation is feasible iff the
+    # max flow saturates every task, and a non-preemptive schedule is also a preemptive one.
+    # record_stats adds the run to flow_filter_stats
+    start_time = time.time()
+    points = sorted(set(task[0] for task in tasks) | set(task[2] for task in tasks))
+    source, sink = 0, 1
+    edges = []
+    for i, (r, e, d) in enumerate(tasks):
+        edges.append((source, 2 + i, e))
+        for k in range(len(points) - 1):
+            if r <= points[k] and points[k + 1] <= d:
+                edges.append((2 + i, 2 + len(tasks) + k, points[k + 1] - points[k]))
+    for k in range(len(points) - 1):
+        edges.append((2 + len(tasks) + k, sink, resources * (points[k + 1] - points[k])))
+
+    feasible = max_flow(2 + len(tasks) + len(points), edges, source, sink) == sum(task[1] for task in tasks)
+
+    if record_stats:
+        flow_filter_stats['runs'] += 1
+        flow_filter_stats['caught'] += not feasible
+        flow_filter_stats['time'] += time.time() - start_time
+    return feasible
+
+def refute_instance(tasks, resources, record_stats=True):
+    # UNSAT-only checks in front of the encoders: window lengths, compulsory overlaps, the
+    # vectorised energy check and the preemptive flow filter. They never decide a SAT instance.
+    # Returns (result, method, evidence) like bound_instance, with result "UNSAT" or None.
+    # Subproblem solvers pass record_stats=False, so that the flow filter report only counts
+    # whole instances
+    if any(e > d - r for r, e, d in tasks):
+        return "UNSAT", "infeasible window bound", None
+
+    # Compulsory parts sharing a time point need distinct resources
+    if len(compulsory_clique(tasks)) > resources:
+        return "UNSAT", "compulsory overlap bound", None
+
+    # Minimum energies that do not fit in some window
+    certificate = energy_certificate(tasks, resources)
+    if certificate is not None:
+        return "UNSAT", "energy bound", certificate
+
+    # Infeasible even when tasks may be interrupted and resumed on another resource
+    if not preemptive_feasible(tasks, resources, record_stats):
+        return "UNSAT", "preemptive flow bound", None
+
+    return None, None, None
+
+def schedule_bound(tasks, resources):
+    # SAT-deciding bounds: release-time starts when the resources cover every window overlap,
+    # EDF list scheduling otherwise. Returns ("SAT", method, validated (starts, task_resource))
+    # or (None, None, None)
+    if window_clique(tasks) <= resources:
+        starts = [r for r, e, d in tasks]
+        schedule = (starts, assign_resources(tasks, starts, resources))
+        method = "window clique bound"
+    else:
+        schedule = edf_schedule(tasks, resources)
+        method = "EDF bound"
+
+    if schedule is not None and schedule_error(tasks, *schedule, resources) is None:
+        return "SAT", method, schedule
+    return None, None, None
+
+def bound_instance(tasks, resources, record_stats=True):
+    # Bounding stage for subproblems: the UNSAT-only checks, then the SAT-deciding bounds.
+    # Returns (result, method, evidence): result is "SAT" or "UNSAT" when a bound decides the
+    # instance and None otherwise, method names the deciding bound for the log, evidence is the
+    # validated (starts, task_resource) for SAT and the (a, b, energy) window for an energy UNSAT
+    result = refute_instance(tasks, resources, record_stats)
+    if result[0] is not None:
+        return result
+    return schedule_bound(tasks, resources)
@@ -0,0 +1,34 @@
+import heapq
+
+import numpy as np
+
+# Conflict graph shared by the encoders. Only tasks whose windows [r, d)
+# intersect can ever compete for a resource, so the D0/D3 families only need
+# those pairs. A sweep over the windows sorted by release time lists them in
+# O(n log n + k) for k intersecting pairs instead of testing all n^2 / 2.
+
+def conflict_graph(tasks):
+    # Returns NumPy arrays (pairs, lo, hi, must):
+    # pairs[k] = (i, ip) with i < ip for every pair of intersecting windows,
+    # [lo[k], hi[k]) = [max(r_i, r_ip), min(d_i, d_ip)) is the common range of the pair, and
+    # must[k] is set when the two tasks overlap wherever they start (check_overlap, used by D0)
+    found = []
+    active = []  # (d, i) of the windows still open at the current release time
+    for i in sorted(range(len(tasks)), key=lambda i: tasks[i][0]):
+        while active and active[0][0] <= tasks[i][0]:
+            heapq.heappop(active)
+        for _, ip in active:
+            found.append((min(i, ip), max(i, ip)))
+        heapq.heappush(active, (tasks[i][2], i))
+
+    found.sort()
+    pairs = np.array(found, dtype=int).reshape(-1, 2)
+    r = np.array([task[0] for task in tasks], dtype=int)
+    e = np.array([task[1] for task in tasks], dtype=int)
+    d = np.array([task[2] for task in tasks], dtype=int)
+    i, ip = pairs[:, 0], pairs[:, 1]
+
+    lo = np.maximum(r[i], r[ip])
+    hi = np.minimum(d[i], d[ip])
+    must = (r[ip] + e[ip] > d[i] - e[i]) & (d[ip] - e[ip] < r[i] + e[i])
+    return pairs, lo, hi, must
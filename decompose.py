@@ -0,0 +1,83 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from bounds import window_clique
+
+# Decomposition into independent subproblems. Tasks whose windows [r, d) are not
+# connected through overlaps never compete for a resource, so every connected
+# component of the window-overlap graph can be solved on its own and the
+# schedules merged. Components of an interval graph are separated by the gaps
+# in the union of the windows, so one sweep over the release times finds them.
+
+def split_components(tasks):
+    # Connected components of the window-overlap graph, each a list of task indices in index order
+    components = []
+    current, reach = [], None
+    for i in sorted(range(len(tasks)), key=lambda i: tasks[i][0]):
+        if current and tasks[i][0] >= reach:
+            components.append(sorted(current))
+            current = []
+        if not current:
+            reach = tasks[i][2]
+        current.append(i)
+        reach = max(reach, tasks[i][2])
+    if current:
+        components.append(sorted(current))
+    return components
+
+def solve_components(tasks, resources, components, solve_component, time_budget, processes=None):
+    # Solve the components in a process pool of the platform's default start method within one
+    # time budget. solve_component(tasks, resources, budget) must be a module-level function
+    # returning (result, starts, task_resource, variables, clauses), and the driver must only run
+    # its main code under __main__, so that spawned workers can import it. Components start as
+    # workers become free: with p components left to start on w workers, the next one gets
+    # min(w, p) / p of the budget still left, so the time a component does not use goes to the
+    # later ones and no component runs past time_budget. Components left when the budget is spent
+    # time out without starting, and none starts after an UNSAT.
+    # Returns the merged (result, starts, task_resource, variables, clauses)
+    deadline = time.time() + time_budget
+    sub_tasks = [[tasks[i] for i in component] for component in components]
+    sub_resources = [min(resources, window_clique(sub)) for sub in sub_tasks]
+    workers = processes or os.cpu_count() or 1
+
+    results = [None] * len(components)
+    waiting = list(range(len(components)))
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while waiting or running:
+            unsat = any(result is not None and result[0] == "UNSAT" for result in results)
+            while waiting and len(running) < workers and not unsat:
+                budget = (deadline - time.time()) * min(workers, len(waiting)) / len(waiting)
+                k = waiting.pop(0)
+                if budget <= 0:
+                    results[k] = ("Time out", None, None, 0, 0)
+                    continue
+                running[pool.submit(solve_component, sub_tasks[k], sub_resources[k], budget)] = k
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    finished = [result for result in results if result is not None]
+    num_variables = sum(result[3] for result in finished)
+    num_clauses = sum(result[4] for result in finished)
+
+    # One UNSAT component decides the instance, any other failure leaves it open
+    statuses = [result[0] for result in finished]
+    if "UNSAT" in statuses:
+        return "UNSAT", None, None, num_variables, num_clauses
+    failed = [status for status in statuses if status != "SAT"]
+    if failed:
+        return failed[0], None, None, num_variables, num_clauses
+
+    # Components never overlap in time, so each one reuses the resource ids 0..k-1
+    starts = [None] * len(tasks)
+    task_resource = [None] * len(tasks)
+    for component, (_, sub_starts, sub_resource, _, _) in zip(components, results):
+        for k, i in enumerate(component):
+            starts[i] = sub_starts[k]
+            task_resource[i] = sub_resource[k]
+
+    return "SAT", starts, task_resource, num_variables, num_clauses
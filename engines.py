@@ -0,0 +1,215 @@
+import heapq
+import time
+
+from resource_decoder import assign_resources, schedule_error
+
+# Special-case engines in front of the encoders. Some instance classes are
+# decided without SAT: unit-time tasks by a matching of tasks to time slots,
+# equal-length tasks on a single resource by the forbidden-region algorithm of
+# Garey, Johnson, Simons and Tarjan, and any single-resource instance by a
+# branch-and-bound pruned with Jackson's preemptive bound.
+
+# Suite totals per instance class, reported by the drivers after each input folder
+engine_stats = {}
+
+def instance_class(tasks, resources):
+    # Class of an instance after normalisation. Normalisation divides r, e and d by their common
+    # GCD, so equal lengths only became unit-time when every window lies on the same grid.
+    # The forbidden-region engine handles a single resource, so "equal-length" is only assigned
+    # there: equal lengths with off-grid windows on several resources stay "general" and go to SAT
+    lengths = set(task[1] for task in tasks)
+    if lengths == {1}:
+        return "unit-time"
+    if resources == 1 and len(lengths) == 1:
+        return "equal-length"
+    if resources == 1:
+        return "single-resource"
+    return "general"
+
+def unit_time_schedule(tasks, resources):
+    # Tasks are intervals of time slots, each slot holds `resources` tasks. Filling every slot
+    # with the released tasks of earliest deadline is a maximum matching of this convex
+    # bipartite graph (Glover), so a task missing its deadline proves the instance UNSAT.
+    # Returns the starts or None
+    order = sorted(range(len(tasks)), key=lambda i: tasks[i][0])
+    ready = []
+    starts = [None] * len(tasks)
+
+    k, t = 0, 0
+    while k < len(tasks) or ready:
+        if not ready:
+            t = max(t, tasks[order[k]][0])
+        while k < len(tasks) and tasks[order[k]][0] <= t:
+            i = order[k]
+            heapq.heappush(ready, (tasks[i][2], i))
+            k += 1
+
+        for _ in range(min(resources, len(ready))):
+            d, i = heapq.heappop(ready)
+            if d <= t:
+                return None
+            starts[i] = t
+        t += 1
+
+    return starts
+
+def forbidden_regions(tasks, p):
+    # Forbidden regions of 1|r, p_j = p|: for each release r0 (latest first) and deadline dk,
+    # the tasks released at or after r0 with deadline at most dk are scheduled backwards from dk,
+    # as late as possible and outside the regions found so far. If they must start by c < r0 + p,
+    # no task may start in (c - p, r0). Returns the (a, b) regions, or None when some c < r0
+    regions = []
+    deadlines = sorted(set(task[2] for task in tasks))
+    for r0 in sorted(set(task[0] for task in tasks), reverse=True):
+        latest = None
+        for dk in deadlines:
+            group = sorted((task[2] for task in tasks if task[0] >= r0 and task[2] <= dk), reverse=True)
+            if not group:
+                continue
+            s = None
+            for d in group:
+                s = d - p if s is None else min(s, d) - p
+                # Move the start left out of the forbidden regions
+                moved = True
+                while moved:
+                    moved = False
+                    for a, b in regions:
+                        if a < s < b:
+                            s, moved = a, True
+            if s < r0:
+                return None
+            latest = s if latest is None else min(latest, s)
+        if latest is not None and latest < r0 + p:
+            regions.append((latest - p, r0))
+    return regions
+
+def equal_length_schedule(tasks):
+    # EDF on one resource that never starts a task inside a forbidden region: it meets every
+    # deadline iff the instance is feasible. Returns the starts or None
+    p = tasks[0][1]
+    regions = forbidden_regions(tasks, p)
+    if regions is None:
+        return None
+
+    order = sorted(range(len(tasks)), key=lambda i: tasks[i][0])
+    ready = []
+    starts = [None] * len(tasks)
+
+    k, t = 0, 0
+    while k < len(tasks) or ready:
+        if not ready:
+            t = max(t, tasks[order[k]][0])
+        # Jump over the forbidden regions containing t
+        moved = True
+        while moved:
+            moved = False
+            for a, b in regions:
+                if a < t < b:
+                    t, moved = b, True
+        while k < len(tasks) and tasks[order[k]][0] <= t:
+            i = order[k]
+            heapq.heappush(ready, (tasks[i][2], i))
+            k += 1
+
+        d, i = heapq.heappop(ready)
+        if t + p > d:
+            return None
+        starts[i] = t
+        t += p
+
+    return starts
+
+def jackson_feasible(tasks, remaining, t):
+    # Jackson's preemptive bound: preemptive EDF of the remaining tasks from time t,
+    # a missed deadline means no completion of the partial schedule exists
+    order = sorted(remaining, key=lambda i: tasks[i][0])
+    ready = []
+    k = 0
+    while k < len(order) or ready:
+        if not ready:
+            t = max(t, tasks[order[k]][0])
+        while k < len(order) and tasks[order[k]][0] <= t:
+            i = order[k]
+            heapq.heappush(ready, [tasks[i][2], i, tasks[i][1]])
+            k += 1
+        # Run the earliest deadline until it finishes or the next release
+        entry = ready[0]
+        run = entry[2] if k == len(order) else min(entry[2], max(tasks[order[k]][0] - t, 0))
+        if run == 0:
+            continue
+        t += run
+        entry[2] -= run
+        if entry[2] == 0:
+            heapq.heappop(ready)
+            if t > entry[0]:
+                return False
+    return True
+
+def single_resource_schedule(tasks, time_limit):
+    # Depth-first branch-and-bound over active sequences: the next task starts before every
+    # other remaining task could finish, nodes whose remaining tasks fail Jackson's bound are
+    # pruned. Returns ("SAT", starts), ("UNSAT", None) or (None, None) after time_limit seconds
+    start_time = time.time()
+    starts = [None] * len(tasks)
+
+    def children(t, remaining):
+        # Candidates in deadline order, None when the node is pruned
+        if not jackson_feasible(tasks, remaining, t):
+            return None
+        horizon = min(max(t, tasks[i][0]) + tasks[i][1] for i in remaining)
+        candidates = [i for i in remaining if max(t, tasks[i][0]) < horizon]
+        return sorted(candidates, key=lambda i: (tasks[i][2], tasks[i][0], i))
+
+    # Stack of (time, remaining tasks, candidates left to try)
+    remaining = set(range(len(tasks)))
+    stack = [(0, remaining, children(0, remaining))]
+    while stack:
+        if time.time() - start_time > time_limit:
+            return None, None
+        t, remaining, candidates = stack[-1]
+        if not remaining:
+            return "SAT", starts
+        if not candidates:
+            stack.pop()
+            continue
+        i = candidates.pop(0)
+        start = max(t, tasks[i][0])
+        if start + tasks[i][1] > tasks[i][2]:
+            continue
+        starts[i] = start
+        rest = remaining - {i}
+        stack.append((start + tasks[i][1], rest, children(start + tasks[i][1], rest) if rest else []))
+
+    return "UNSAT", None
+
+def special_case(tasks, resources, time_limit):
+    # Route the special classes to their engine. Returns (result, method, evidence) like
+    # bound_instance: result is None for general instances and when the engine gives up
+    instance = instance_class(tasks, resources)
+    if instance == "general" or not tasks:
+        return None, None, None
+
+    start_time = time.time()
+    if instance == "unit-time":
+        starts = unit_time_schedule(tasks, resources)
+        result = "UNSAT" if starts is None else "SAT"
+    elif instance == "equal-length":
+        starts = equal_length_schedule(tasks)
+        result = "UNSAT" if starts is None else "SAT"
+    else:
+        result, starts = single_resource_schedule(tasks, time_limit)
+
+    schedule = None
+    if result == "SAT":
+        schedule = (starts, assign_resources(tasks, starts, resources))
+        if schedule[1] is None or schedule_error(tasks, *schedule, resources) is not None:
+            result, schedule = None, None
+
+    stats = engine_stats.setdefault(instance, {'runs': 0, 'decided': 0, 'time': 0.0})
+    stats['runs'] += 1
+    stats['decided'] += result is not None
+    stats['time'] += time.time() - start_time
+
+    if result is None:
+        return None, None, None
+    return result, f"{instance} engine", schedule
@@ -10,7 +10,24 @@ import os
 import ast
 import time
 
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_bounds, value_precedence_rows
+from symmetry import identical_task_groups, identical_task_pairs
+
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
 time_budget = 600  # Set your desired time budget in seconds
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
 type = "es3_improved_mip"
 id_counter = 1
 
@@ -89,20 +106,37 @@ def encode_problem_es3(tasks, resources):
 
     # Constraints
 
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
     # Overlapping: check each pair of tasks to see if they are overlap time
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            if check_overlap(tasks[i], tasks[ip]):
-                for j in range(resources):
-                    model.add_constraint(u[i, j] + u[ip, j] <= 1)
-
-    # Symmetry breaking 1: Assign the tasks to resources if have r_max <= d_min (min of all tasks)
-    d_min = min(task[2] for task in tasks)
-    fixed_tasks = [i for i in range(len(tasks)) if tasks[i][2] - tasks[i][1] <= d_min]
+    for i, ip in pairs[must].tolist():
+        for j in range(resources):
+            model.add_constraint(u[i, j] + u[ip, j] <= 1)
+
+    # Symmetry breaking 1: tasks whose compulsory parts [d - e, r + e) share a time point pairwise overlap, pin the largest such clique to resources 0..k-1
+    fixed_tasks = compulsory_clique(tasks)
     for j, i in enumerate(fixed_tasks):
         if j < resources:
             model.add_constraint(u[i, j] == 1)
 
+    # Symmetry breaking 3: value precedence, the task at position q of the task order only uses resources <= q (VP1),
+    # and resource j > 0 only once an earlier task uses resource j - 1 (VP2)
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        for i, j in value_precedence_bounds(order, resources):
+            model.add_constraint(u[i, j] == 0)
+        for i, j, earlier in value_precedence_rows(order, resources):
+            model.add_constraint(u[i, j] <= model.sum(u[k, j - 1] for k in earlier))
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        for a, b in identical_task_pairs(groups):
+            r, e, d = tasks[a]
+            model.add_constraint(model.sum(t * z[a, t] for t in range(r, d)) <= model.sum(t * z[b, t] for t in range(r, d)))
+
     # Symmetry breaking 2: if each task i has t in range(r_max, d_min), then z[i][t] = True
     for i in range(len(tasks)):
         for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
@@ -188,7 +222,7 @@ def solve_es3(tasks, resources):
     start_time = time.time()
     model, u, z, y = encode_problem_es3(tasks, resources)
     if not model:
-        return "ERROR", 0, 0, 0
+        return "ERROR", 0, 0, 0, None
 
     model.set_time_limit(time_budget)  # Set time limit in seconds
 
@@ -203,16 +237,14 @@ def solve_es3(tasks, resources):
     print_to_console_and_log(f"Num of variables: {num_variables}")
     print_to_console_and_log(f"Num of constraints: {num_constraints}")
 
+    schedule = None
     if solution:
         print_to_console_and_log("Solution found.")
         res = "SAT"
-        for i in range(len(tasks)):
-            for j in range(resources):
-                if u[i, j].solution_value > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is assigned to resource {j+1}")
-            for t in range(tasks[i][0], tasks[i][2]):
-                if z[i, t].solution_value > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is accessing a resource at time {t}")
+        # Schedule for the report in input task ids and times
+        starts = [next(t for t in range(tasks[i][0], tasks[i][2]) if z[i, t].solution_value > 0.5) for i in range(len(tasks))]
+        task_resource = [next(j for j in range(resources) if u[i, j].solution_value > 0.5) for i in range(len(tasks))]
+        schedule = (starts, task_resource)
         if not validate_solution(tasks, model, u, z, y, resources):
             sys.exit(1)
     elif model.solve_details.status == "infeasible":
@@ -222,7 +254,7 @@ def solve_es3(tasks, resources):
         print_to_console_and_log("Solver timed out.")
         res = "TIMEOUT"
 
-    return res, solve_time, num_variables, num_constraints
+    return res, solve_time, num_variables, num_constraints, schedule
 
 def process_input_files(input_folder, resources=200):
     global id_counter, type
@@ -237,7 +269,8 @@ def process_input_files(input_folder, resources=200):
                 print(f"tasks: {tasks}")
 
             print_to_console_and_log(f"Processing {filename}...")
-            res, solve_time, num_variables, num_clauses = solve_es3(tasks, num_tasks)
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
             # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
             # results[filename] = {
             #     "result": res,
@@ -252,11 +285,20 @@ def process_input_files(input_folder, resources=200):
                 "Time": solve_time,
                 "Result": res,
                 "Variables": num_variables,
-                "Clauses": num_clauses
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
             }
             write_to_xlsx(result_dict)
             id_counter += 1
 
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
     # return results
 
 # Main execution
@@ -0,0 +1,380 @@
+import sys
+import pandas as pd
+from datetime import datetime
+from openpyxl import load_workbook, Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from zipfile import BadZipFile
+
+from pysat.solvers import Glucose3
+from pysat.card import CardEnc, EncType
+import time
+from threading import Thread, Event
+import os
+import ast
+
+from bounds import flow_filter_stats
+from engines import engine_stats
+from pipeline import solve_instance
+from resource_decoder import decode_starts, assign_resources, schedule_to_model
+from symmetry import identical_task_groups, started_by_literals, identical_task_clauses
+
+sat_solver = Glucose3
+card_encoding = EncType.totalizer  # Cardinality network used for the capacity constraints
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
+local_search = False  # Run the local-search engine on very large instances before encoding
+local_search_tasks = 1000  # Task count from which an instance is very large
+local_search_budget = 60  # Local-search time budget in seconds
+lns = False  # Repair very large instances by large-neighbourhood search with the SAT encoder
+lns_budget = 120  # Large-neighbourhood search time budget in seconds
+lns_iteration_budget = 5  # Time budget of one neighbourhood subproblem in seconds
+rolling_horizon = False  # Solve long horizons window by window before the full solve
+rolling_min_horizon = 2000  # Horizon from which the rolling-horizon solver runs
+rolling_window = 500  # Length of a rolling-horizon window
+rolling_overlap = 100  # End of a window that is solved again with the next one
+rolling_step_budget = 30  # Time budget of one rolling-horizon window in seconds
+decomposition = True  # Solve independent components of the window-overlap graph in parallel
+time_budget = 600  # Set your desired time budget in seconds
+type = "es3_cumulative"
+id_counter = 1
+id_variable: int
+
+# Open the log file in append mode
+log_file = open('console.log', 'a')
+
+def write_to_xlsx(result_dict):
+    # Append the result to a list
+    excel_results = []
+    excel_results.append(result_dict)
+
+    output_path =  'out/'
+
+    # Write the results to an Excel file
+    if not os.path.exists(output_path): os.makedirs(output_path)
+
+    df = pd.DataFrame(excel_results)
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    excel_file_path = f"{output_path}/results_{current_date}.xlsx"
+
+    # Check if the file already exists
+    if os.path.exists(excel_file_path):
+        try:
+            book = load_workbook(excel_file_path)
+        except BadZipFile:
+            book = Workbook()  # Create a new workbook if the file is not a valid Excel file
+
+        # Check if the 'Results' sheet exists
+        if 'Results' not in book.sheetnames:
+            book.create_sheet('Results')  # Create 'Results' sheet if it doesn't exist
+
+        sheet = book['Results']
+        for row in dataframe_to_rows(df, index=False, header=False): sheet.append(row)
+        book.save(excel_file_path)
+
+    else: df.to_excel(excel_file_path, index=False, sheet_name='Results', header=False)
+
+    print_to_console_and_log(f"Result added to Excel file: {os.path.abspath(excel_file_path)}\n")
+
+
+# Define a custom print function that writes to both console and log file
+def print_to_console_and_log(*args, **kwargs):
+    print(*args, **kwargs)
+    print(*args, file = log_file, **kwargs)
+    log_file.flush()
+
+def at_most_k(var, k):
+    global id_variable
+
+    # Encode sum(var) <= k with a cardinality network over fresh auxiliary variables
+    cnf = CardEnc.atmost(lits=var, bound=k, top_id=id_variable, encoding=card_encoding)
+
+    for clause in cnf.clauses:
+        sat_solver.add_clause(clause)
+        # print(f"Added clause: {clause}")
+
+    # Update the global variable id_variable based on the new variables introduced by the encoding
+    id_variable = max(id_variable, cnf.nv)
+
+def encode_problem_es3(tasks, resources):
+    global id_variable
+    max_time = max(task[2] for task in tasks)
+
+    # Resources are identical, so no u[i][j] variables: the resource index is assigned after solving
+    # Variables z[i][t] for task i accessing some resource at time t
+    z = [[i * max_time + t + 1 for t in range(tasks[i][2])] for i in range(len(tasks))]
+
+    # Calculate id_variable
+    id_variable = len(tasks) * max_time
+
+    # Symmetry breaking 2: if each task i has t in range(r_max, d_min), then z[i][t] = True
+    for i in range(len(tasks)):
+        for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([z[i][t]])
+            # print(f"Added clause S2: z{i+1}{t}")
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order (no resource tie-break, resources are assigned after solving)
+    if identical_tasks:
+        groups = identical_task_groups(tasks, [])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        starts_by, clauses, id_variable = started_by_literals(tasks, groups, lambda i, t: z[i][t], id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+        clauses, id_variable = identical_task_clauses(tasks, groups, starts_by, None, resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # D3 (cumulative): at most `resources` tasks hold some resource at each time t.
+    # Tasks whose window is exactly their execution time are fixed: they leave the sum and use up capacity instead
+    for t in range(max_time):
+        active = [i for i in range(len(tasks)) if tasks[i][0] <= t < tasks[i][2]]
+        fixed = [i for i in active if tasks[i][2] - tasks[i][0] == tasks[i][1]]
+        if len(fixed) > resources:
+            fixed = []
+        z_list = [z[i][t] for i in active if i not in fixed]
+        if len(z_list) > resources - len(fixed):
+            at_most_k(z_list, resources - len(fixed))
+
+    for i in range(len(tasks)):
+        clause = []
+        clause_str = []
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1] + 1):
+            clause.append(z[i][t])
+            clause_str.append(f"z{i+1}{t}")
+        sat_solver.add_clause(clause)
+        # print(f"Added clause C3: {clause_str}")
+
+    for i in range(len(tasks)):
+        for t in range(tasks[i][0] + 1, tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], z[i][t]])
+            # print(f"Added clause C41: -z{i+1}{tasks[i][0]} z{i+1}{t}")
+
+        for t in range (tasks[i][0] + tasks[i][1], tasks[i][2]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], -z[i][t]])
+            # print(f"Added clause C42: -z{i+1}{tasks[i][0]} -z{i+1}{t}")
+
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1]):
+            for tpp in range(t+1, t + tasks[i][1] + 1):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], z[i][tpp]])
+                    # print(f"Added clause C51: z{i+1}{t}, -z{i+1}{t+1}, z{i+1}{tpp}")
+
+            for tpp in range(t + tasks[i][1] + 1, tasks[i][2]):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], -z[i][tpp]])
+                    # print(f"Added clause C52: z{i+1}{t}, -z{i+1}{t+1}, -z{i+1}{tpp}")
+
+    return z
+
+def solve_with_timeout(tasks, resources, result_container, finished_event):
+    global sat_solver
+    sat_solver = Glucose3()
+
+    try:
+        z = encode_problem_es3(tasks, resources)
+        # Interruptible, so that a timed-out subproblem hands the solver back
+        result = sat_solver.solve_limited(expect_interrupt=True)
+
+        result_container['variables'] = sat_solver.nof_vars()
+        result_container['clauses'] = sat_solver.nof_clauses()
+
+        if result is None:
+            result_container['status'] = 'TIMEOUT'
+        elif result:
+            model = sat_solver.get_model()
+            result_container['status'] = 'SAT'
+            result_container['model'] = model
+            result_container['z'] = z
+        else:
+            result_container['status'] = 'UNSAT'
+
+    except Exception as e:
+        result_container['status'] = 'ERROR'
+        result_container['error'] = str(e)
+
+    finished_event.set()
+
+def solve_es3(tasks, resources):
+    global sat_solver
+
+    result_container = {}
+    finished_event = Event()
+
+    start_time = time.time()
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+
+    # Wait for either completion or timeout
+    finished = finished_event.wait(timeout=time_budget)
+    solve_time = time.time() - start_time
+
+    if not finished:
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", solve_time, 0, 0, None
+
+    num_variables = result_container.get('variables', 0)
+    num_clauses = result_container.get('clauses', 0)
+
+    if result_container.get('status') == 'SAT':
+        model = result_container['model']
+        z = result_container['z']
+
+        # Resources are identical: colour the decoded start times, then map back to the u/z layout
+        starts = decode_starts(tasks, model, z)
+        task_resource = assign_resources(tasks, starts, resources)
+        if task_resource is None:
+            print_to_console_and_log("Error: Start times need more resources than available")
+            sys.exit(1)
+        model, u, z = schedule_to_model(tasks, starts, task_resource, resources)
+
+        print("SAT")
+
+        if not validate_solution(tasks, model, u, z, resources):
+            sys.exit(1)
+
+        sat_solver.delete()
+        return "SAT", solve_time, num_variables, num_clauses, (starts, task_resource)
+
+    elif result_container.get('status') == 'UNSAT':
+        print_to_console_and_log("UNSAT")
+        sat_solver.delete()
+        return "UNSAT", solve_time, num_variables, num_clauses, None
+
+    else:
+        print_to_console_and_log(f"Error: {result_container.get('error')}")
+        sat_solver.delete()
+        return "ERROR", solve_time, 0, 0, None
+
+def solve_component(tasks, resources, budget=None):
+    # Solve one independent component in a worker process of the decomposition stage, or one
+    # large-neighbourhood subproblem with its own time budget.
+    # Returns (result, starts, task_resource, variables, clauses) in component task indices
+    result_container = {}
+    finished_event = Event()
+
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+
+    if not finished_event.wait(timeout=time_budget if budget is None else budget):
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", None, None, 0, 0
+
+    sat_solver.delete()
+    num_variables = result_container.get('variables', 0)
+    num_clauses = result_container.get('clauses', 0)
+
+    if result_container.get('status') != 'SAT':
+        return result_container.get('status'), None, None, num_variables, num_clauses
+
+    starts = decode_starts(tasks, result_container['model'], result_container['z'])
+    task_resource = assign_resources(tasks, starts, resources)
+    if task_resource is None:
+        return "ERROR", None, None, num_variables, num_clauses
+    return "SAT", starts, task_resource, num_variables, num_clauses
+
+def validate_solution(tasks, model, u, z, resources):
+    task_resource = {}
+    task_times = {}
+    resource_usage = {j: [] for j in range(resources)}
+
+    for i, task in enumerate(tasks):
+        for j in range(resources):
+            if model[u[i][j] - 1] > 0:
+                task_resource[i] = j
+        
+        task_times[i] = [t for t in range(task[0], task[2]) if model[z[i][t] - 1] > 0]
+        
+        if task_resource.get(i) is not None:
+            resource_usage[task_resource[i]].extend(task_times[i])
+
+    # Check constraints
+    for i, task in enumerate(tasks):
+        # Check if task is assigned to exactly one resource
+        if i not in task_resource:
+            print_to_console_and_log(f"Error: Task {i} is not assigned to any resource")
+            return False
+
+        # Check if task starts after its release time
+        if task_times[i][0] < task[0]:
+            print_to_console_and_log(f"Error: Task {i+1} starts before its release time")
+            return False
+
+        # Check if task finishes before its deadline
+        if task_times[i][-1] >= task[2]:
+            print_to_console_and_log(f"Error: Task {i+1} finishes after its deadline")
+            return False
+
+        # Check if task execution is continuous and matches the execution time
+        if len(task_times[i]) != task[1] or any(task_times[i][j+1] - task_times[i][j] != 1 for j in range(len(task_times[i])-1)):
+            print_to_console_and_log(f"Error: Task {i+1} execution is not continuous or doesn't match execution time")
+            return False
+
+    # Check if any resource is used by multiple tasks at the same time
+    for j, times in resource_usage.items():
+        if len(times) != len(set(times)):
+            print_to_console_and_log(f"Error: Resource {j+1} is used by multiple tasks at the same time")
+            return False
+
+    print_to_console_and_log("Solution is valid!")
+    return True
+
+def check_schedule(tasks, starts, task_resource, resources):
+    # Check a schedule from any pipeline stage with validate_solution, through the es3 u/z layout
+    return validate_solution(tasks, *schedule_to_model(tasks, starts, task_resource, resources), resources)
+
+def process_input_files(input_folder, resources=200):
+    global id_counter, type
+
+    # results = {}
+    for filename in os.listdir(input_folder):
+        if filename.endswith(".txt"):
+            file_path = os.path.join(input_folder, filename)
+            with open(file_path, 'r') as f:
+                num_tasks = int(f.readline().strip())
+                tasks = ast.literal_eval(f.readline().strip())
+                print(f"tasks: {tasks}")
+
+            print_to_console_and_log(f"Processing {filename}...")
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
+            # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
+            result_dict = {
+                "ID": id_counter,
+                "Problem": os.path.basename(filename),
+                "Type": type,
+                "Time": solve_time,
+                "Result": res,
+                "Variables": num_variables,
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
+            }
+            write_to_xlsx(result_dict)
+            id_counter += 1
+
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
+    # return results
+
+# Main execution, guarded so that the decomposition workers can import this module
+if __name__ == "__main__":
+    input_folder = "input/" + sys.argv[1]
+    # input_folder = "input/huge"
+    process_input_files(input_folder)
+
+    log_file.close()
@@ -0,0 +1,472 @@
+import sys
+import pandas as pd
+from datetime import datetime
+from openpyxl import load_workbook, Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from zipfile import BadZipFile
+
+# from pysat.formula import CNF
+from pysat.solvers import Glucose3, Solver
+from itertools import product
+import time
+from threading import Thread, Event
+import os
+import ast
+
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from resource_decoder import schedule_to_model
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_clauses
+from symmetry import identical_task_groups, identical_task_clauses
+
+sat_solver = Glucose3
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
+start_encoding = "log"  # Encoding of the start times: "log" (size logarithmic in the horizon) or "order" (linear)
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
+time_budget = 600  # Set your desired time budget in seconds
+type = f"es3_disjunctive_{start_encoding}"
+id_counter = 1
+id_variable: int
+
+# Open the log file in append mode
+log_file = open('console.log', 'a')
+
+def write_to_xlsx(result_dict):
+    # Append the result to a list
+    excel_results = []
+    excel_results.append(result_dict)
+
+    output_path =  'out/'
+
+    # Write the results to an Excel file
+    if not os.path.exists(output_path): os.makedirs(output_path)
+
+    df = pd.DataFrame(excel_results)
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    excel_file_path = f"{output_path}/results_{current_date}.xlsx"
+
+    # Check if the file already exists
+    if os.path.exists(excel_file_path):
+        try:
+            book = load_workbook(excel_file_path)
+        except BadZipFile:
+            book = Workbook()  # Create a new workbook if the file is not a valid Excel file
+
+        # Check if the 'Results' sheet exists
+        if 'Results' not in book.sheetnames:
+            book.create_sheet('Results')  # Create 'Results' sheet if it doesn't exist
+
+        sheet = book['Results']
+        for row in dataframe_to_rows(df, index=False, header=False): sheet.append(row)
+        book.save(excel_file_path)
+
+    else: df.to_excel(excel_file_path, index=False, sheet_name='Results', header=False)
+
+    print_to_console_and_log(f"Result added to Excel file: {os.path.abspath(excel_file_path)}\n")
+
+
+# Define a custom print function that writes to both console and log file
+def print_to_console_and_log(*args, **kwargs):
+    print(*args, **kwargs)
+    print(*args, file = log_file, **kwargs)
+    log_file.flush()
+
+def check_overlap(task1, task2):
+    # Suppose: task1 = (r1, e1, d1), task2 = (r2, e2, d2)
+    # r1_min = r1, r1_max = d1 - e1, d1_min = r1 + e1, d1_max = d1
+    # r2_min = r2, r2_max = d2 - e2, d2_min = r2 + e2, d2_max = d2
+    # task1 and task2 are overlapped if: 
+    # 1. d2_min >= r1_max and r2_max <= d1_min
+    # 2. d1_min >= r2_max and r1_max <= d2_min
+    # => r2 + e2 >= d1 - e1 and d2 - e2 <= r1 + e1 or r1 + e1 >= d2 - e2 and d1 - e1 <= r2 + e2
+    if task2[0] + task2[1] > task1[2] - task1[1] and task2[2] - task2[1] < task1[0] + task1[1]:
+        return True
+    if task1[0] + task1[1] > task2[2] - task2[1] and task1[2] - task1[1] < task2[0] + task2[1]:
+        return True
+    return False
+
+def new_var():
+    global id_variable
+    id_variable += 1
+    return id_variable
+
+# Binary numbers are lists of bits, least significant first, each a literal or the constant True/False
+
+def negate(bit):
+    return not bit if isinstance(bit, bool) else -bit
+
+def add_clause(bits):
+    # Clause over literals and constants: dropped when some bit is True, False bits removed
+    if any(bit is True for bit in bits):
+        return
+    sat_solver.add_clause([bit for bit in bits if bit is not False])
+
+def xor_bit(a, b):
+    if isinstance(a, bool):
+        return negate(b) if a else b
+    if isinstance(b, bool):
+        return negate(a) if b else a
+    x = new_var()
+    sat_solver.add_clause([-x, a, b])
+    sat_solver.add_clause([-x, -a, -b])
+    sat_solver.add_clause([x, -a, b])
+    sat_solver.add_clause([x, a, -b])
+    return x
+
+def and_bit(a, b):
+    if a is False or b is False:
+        return False
+    if a is True:
+        return b
+    if b is True:
+        return a
+    x = new_var()
+    sat_solver.add_clause([-x, a])
+    sat_solver.add_clause([-x, b])
+    sat_solver.add_clause([x, -a, -b])
+    return x
+
+def constant_bits(value, width):
+    return [bool((value >> k) & 1) for k in range(width)]
+
+def add_constant(bits, value):
+    # Ripple-carry sum of a binary number and a constant, on the same width (the sum must fit)
+    total, carry = [], False
+    for bit, c in zip(bits, constant_bits(value, len(bits))):
+        total.append(negate(xor_bit(bit, carry)) if c else xor_bit(bit, carry))
+        carry = negate(and_bit(negate(bit), negate(carry))) if c else and_bit(bit, carry)
+    return total
+
+def at_least(a, b, lit):
+    # lit -> A >= B for two binary numbers of the same width, from the most significant bit down:
+    # ge_k -> A >= B on bits 0..k, that is A_k >= B_k, and ge_{k-1} when A_k = B_k
+    ge = lit
+    for k in reversed(range(len(a))):
+        lower = new_var() if k > 0 else True
+        add_clause([negate(ge), a[k], negate(b[k])])
+        add_clause([negate(ge), a[k], b[k], lower])
+        add_clause([negate(ge), negate(a[k]), negate(b[k]), lower])
+        ge = lower
+
+def encode_problem_es3(tasks, resources):
+    global id_variable
+
+    # Variables u[i][j] for task i accessing resource j
+    u = [[i * resources + j + 1 for j in range(resources)] for i in range(len(tasks))]
+
+    # Calculate id_variable
+    id_variable = len(tasks) * resources
+
+    if start_encoding == "order":
+        # Variables o[i][t] for task i starting at or before time t (order encoding of the start time S_i)
+        code = [{t: new_var() for t in range(tasks[i][0], tasks[i][2] - tasks[i][1])} for i in range(len(tasks))]
+
+        def starts_by(i, t):
+            # Literal for S_i <= t, or True/False outside the start window
+            if t < tasks[i][0]:
+                return False
+            if t >= tasks[i][2] - tasks[i][1]:
+                return True
+            return code[i][t]
+
+        # O1: S_i <= t -> S_i <= t+1
+        for i in range(len(tasks)):
+            for t in range(tasks[i][0], tasks[i][2] - tasks[i][1] - 1):
+                sat_solver.add_clause([-code[i][t], code[i][t+1]])
+                # print(f"Added clause O1: -o{i+1}{t} o{i+1}{t+1}")
+
+    elif start_encoding == "log":
+        # Variables s[i][k] for bit k of the start time S_i, on the bits of the latest deadline
+        width = max(task[2] for task in tasks).bit_length()
+        code = [[new_var() for k in range(width)] for i in range(len(tasks))]
+
+        # B1: r_i <= S_i <= d_i - e_i
+        for i in range(len(tasks)):
+            at_least(code[i], constant_bits(tasks[i][0], width), True)
+            at_least(constant_bits(tasks[i][2] - tasks[i][1], width), code[i], True)
+
+        # Bits of the end time S_i + e_i
+        ends = [add_constant(code[i], tasks[i][1]) for i in range(len(tasks))]
+
+    else:
+        raise ValueError(f"Unknown start encoding: {start_encoding}")
+
+    # Symmetry breaking 1: tasks whose compulsory parts [d - e, r + e) share a time point pairwise overlap, pin the largest such clique to resources 0..k-1
+    fixed_tasks = compulsory_clique(tasks)
+    # Assign each task in fixed_tasks to a resource
+    for j, i in enumerate(fixed_tasks):
+        if j < resources:
+            sat_solver.add_clause([u[i][j]])
+        # print(f"Added clause S1: u{i+1}{j+1}")
+
+    # Symmetry breaking 3: value precedence, resource j is only used once resource j-1 is used earlier in the task order
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        clauses, id_variable = value_precedence_clauses(order, lambda i, j: [u[i][j]], resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order, equal starts use increasing resources
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        if start_encoding == "order":
+            clauses, id_variable = identical_task_clauses(tasks, groups, starts_by, lambda i, j: [u[i][j]], resources, id_variable)
+        else:
+            # L1: S_a <= S_b, L2: tie_a_b v some bit of S_a and S_b differs
+            ties = {}
+            for group in groups:
+                for a, b in zip(group, group[1:]):
+                    at_least(code[b], code[a], True)
+                    ties[a, b] = new_var()
+                    differ = []
+                    for k in range(width):
+                        differ.append(new_var())
+                        sat_solver.add_clause([-differ[k], code[a][k], code[b][k]])
+                        sat_solver.add_clause([-differ[k], -code[a][k], -code[b][k]])
+                    sat_solver.add_clause([ties[a, b]] + differ)
+            clauses, id_variable = identical_task_clauses(tasks, groups, None, lambda i, j: [u[i][j]], resources, id_variable, ties=ties)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # D1: Task i should not access two resources at the same time
+    for i in range(len(tasks)):
+        for j in range(resources):
+            for jp in range(j + 1, resources):
+                sat_solver.add_clause([-u[i][j], -u[i][jp]])
+                # print(f"Added clause D1: -u{i+1}{j+1} -u{i+1}{jp+1}")
+
+    # D2: Each task must get some resource
+    for i in range(len(tasks)):
+        sat_solver.add_clause([u[i][j] for j in range(resources)])
+        # print(f"Added clause D2: u{i+1}1 ... u{i+1}{resources}")
+
+    def add_precedence(i, ip):
+        # Variable b for "task i finishes before task ip starts", None if the windows rule it out
+        if tasks[i][0] + tasks[i][1] > tasks[ip][2] - tasks[ip][1]:
+            return None
+        b = new_var()
+        if start_encoding == "log":
+            # P2: b -> S_ip >= S_i + e_i, compared bitwise
+            at_least(code[ip], ends[i], b)
+            return b
+        # P1: b ^ S_i >= t -> S_ip >= t + e_i
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1] + 1):
+            lit_i = starts_by(i, t - 1)
+            lit_ip = starts_by(ip, t + tasks[i][1] - 1)
+            if lit_ip is False or lit_i is True:
+                continue
+            clause = [-b]
+            if lit_i is not False:
+                clause.append(lit_i)
+            if lit_ip is not True:
+                clause.append(-lit_ip)
+            sat_solver.add_clause(clause)
+            # print(f"Added clause P1: {clause}")
+        return b
+
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
+    # Sequencing: two tasks on the same resource must be ordered one way or the other
+    for (i, ip), overlap in zip(pairs.tolist(), must.tolist()):
+        before = [] if overlap else [add_precedence(i, ip), add_precedence(ip, i)]
+        before = [b for b in before if b is not None]
+
+        # D0 when no order is possible, otherwise D3: u_ij ^ u_ipj -> b_i_ip v b_ip_i
+        for j in range(resources):
+            sat_solver.add_clause([-u[i][j], -u[ip][j]] + before)
+            # print(f"Added clause D3: -u{i+1}{j+1} -u{ip+1}{j+1} {before}")
+
+    return u, code
+
+def solve_with_timeout(tasks, resources, result_container, finished_event):
+    global sat_solver
+    sat_solver = Glucose3()
+    
+    try:
+        u, code = encode_problem_es3(tasks, resources)
+        # Interruptible, so that solve_es3 can stop the search at the time budget
+        result = sat_solver.solve_limited(expect_interrupt=True)
+
+        result_container['variables'] = sat_solver.nof_vars()
+        result_container['clauses'] = sat_solver.nof_clauses()
+        
+        if result is None:
+            result_container['status'] = 'TIMEOUT'
+        elif result:
+            model = sat_solver.get_model()
+            # pysat leaves variables that occur in no clause out of the model: they are free, read them as false
+            model += [-v for v in range(len(model) + 1, id_variable + 1)]
+            result_container['status'] = 'SAT'
+            result_container['model'] = model
+            result_container['u'] = u
+            result_container['code'] = code
+        else:
+            result_container['status'] = 'UNSAT'
+            
+    except Exception as e:
+        result_container['status'] = 'ERROR'
+        result_container['error'] = str(e)
+    
+    finished_event.set()
+
+def solve_es3(tasks, resources):
+    global sat_solver
+    
+    result_container = {}
+    finished_event = Event()
+    
+    start_time = time.time()
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+    
+    # Wait for either completion or timeout
+    finished = finished_event.wait(timeout=time_budget)
+    solve_time = time.time() - start_time
+    
+    if not finished:
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", solve_time, 0, 0, None
+
+    num_variables = result_container.get('variables', 0)
+    num_clauses = result_container.get('clauses', 0)
+        
+    if result_container.get('status') == 'SAT':
+        model = result_container['model']
+        u = result_container['u']
+        code = result_container['code']
+
+        # Decode S_i, as the first t with S_i <= t or from its bits, and the resource, then map back to the u/z layout
+        if start_encoding == "order":
+            starts = [next((t for t, o_var in code[i].items() if model[o_var - 1] > 0), tasks[i][2] - tasks[i][1]) for i in range(len(tasks))]
+        else:
+            starts = [sum(1 << k for k, s_var in enumerate(code[i]) if model[s_var - 1] > 0) for i in range(len(tasks))]
+        task_resource = [next((j for j in range(resources) if model[u[i][j] - 1] > 0), None) for i in range(len(tasks))]
+        model, u, z = schedule_to_model(tasks, starts, task_resource, resources)
+        
+        print("SAT")
+        
+        if not validate_solution(tasks, model, u, z, resources):
+            sys.exit(1)
+        
+        sat_solver.delete()
+        return "SAT", solve_time, num_variables, num_clauses, (starts, task_resource)
+    
+    elif result_container.get('status') == 'UNSAT':
+        print_to_console_and_log("UNSAT")
+        sat_solver.delete()
+        return "UNSAT", solve_time, num_variables, num_clauses, None
+    
+    else:
+        print_to_console_and_log(f"Error: {result_container.get('error')}")
+        sat_solver.delete()
+        return "ERROR", solve_time, 0, 0, None
+
+def validate_solution(tasks, model, u, z, resources):
+    task_resource = {}
+    task_times = {}
+    resource_usage = {j: [] for j in range(resources)}
+
+    for i, task in enumerate(tasks):
+        for j in range(resources):
+            if model[u[i][j] - 1] > 0:
+                task_resource[i] = j
+        
+        task_times[i] = [t for t in range(task[0], task[2]) if model[z[i][t] - 1] > 0]
+        
+        if task_resource.get(i) is not None:
+            resource_usage[task_resource[i]].extend(task_times[i])
+
+    # Check constraints
+    for i, task in enumerate(tasks):
+        # Check if task is assigned to exactly one resource
+        if i not in task_resource:
+            print_to_console_and_log(f"Error: Task {i} is not assigned to any resource")
+            return False
+
+        # Check if task starts after its release time
+        if task_times[i][0] < task[0]:
+            print_to_console_and_log(f"Error: Task {i+1} starts before its release time")
+            return False
+
+        # Check if task finishes before its deadline
+        if task_times[i][-1] >= task[2]:
+            print_to_console_and_log(f"Error: Task {i+1} finishes after its deadline")
+            return False
+
+        # Check if task execution is continuous and matches the execution time
+        if len(task_times[i]) != task[1] or any(task_times[i][j+1] - task_times[i][j] != 1 for j in range(len(task_times[i])-1)):
+            print_to_console_and_log(f"Error: Task {i+1} execution is not continuous or doesn't match execution time")
+            return False
+
+    # Check if any resource is used by multiple tasks at the same time
+    for j, times in resource_usage.items():
+        if len(times) != len(set(times)):
+            print_to_console_and_log(f"Error: Resource {j+1} is used by multiple tasks at the same time")
+            return False
+
+    print_to_console_and_log("Solution is valid!")
+    return True
+
+def check_schedule(tasks, starts, task_resource, resources):
+    # Check a schedule from any pipeline stage with validate_solution, through the es3 u/z layout
+    return validate_solution(tasks, *schedule_to_model(tasks, starts, task_resource, resources), resources)
+
+def process_input_files(input_folder, resources=200):
+    global id_counter, type
+
+    # results = {}
+    for filename in os.listdir(input_folder):
+        if filename.endswith(".txt"):
+            file_path = os.path.join(input_folder, filename)
+            with open(file_path, 'r') as f:
+                num_tasks = int(f.readline().strip())
+                tasks = ast.literal_eval(f.readline().strip())
+                print(f"tasks: {tasks}")
+
+            print_to_console_and_log(f"Processing {filename}...")
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
+            # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
+            result_dict = {
+                "ID": id_counter,
+                "Problem": os.path.basename(filename),
+                "Type": type,
+                "Time": solve_time,
+                "Result": res,
+                "Variables": num_variables,
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
+            }
+            write_to_xlsx(result_dict)
+            id_counter += 1
+
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
+    # return results
+
+# Main execution
+input_folder = "input/" + sys.argv[1]
+# input_folder = "input/long_duration"
+process_input_files(input_folder)
+
+log_file.close()
\ No newline at end of file
@@ -13,7 +13,37 @@ from threading import Thread, Event
 import os
 import ast
 
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from resource_decoder import decode_starts, schedule_to_model
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_clauses
+from symmetry import identical_task_groups, started_by_literals, identical_task_clauses
+
 sat_solver = Glucose3
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
+local_search = False  # Run the local-search engine on very large instances before encoding
+local_search_tasks = 1000  # Task count from which an instance is very large
+local_search_budget = 60  # Local-search time budget in seconds
+lns = False  # Repair very large instances by large-neighbourhood search with the SAT encoder
+lns_budget = 120  # Large-neighbourhood search time budget in seconds
+lns_iteration_budget = 5  # Time budget of one neighbourhood subproblem in seconds
+rolling_horizon = False  # Solve long horizons window by window before the full solve
+rolling_min_horizon = 2000  # Horizon from which the rolling-horizon solver runs
+rolling_window = 500  # Length of a rolling-horizon window
+rolling_overlap = 100  # End of a window that is solved again with the next one
+rolling_step_budget = 30  # Time budget of one rolling-horizon window in seconds
+decomposition = True  # Solve independent components of the window-overlap graph in parallel
 time_budget = 600  # Set your desired time budget in seconds
 type = "es3_improved_SB"
 id_counter = 1
@@ -84,25 +114,43 @@ def encode_problem_es3(tasks, resources):
     # Variables z[i][t] for task i accessing some resource at time t
     z = [[len(tasks) * resources + i * max_time + t + 1 for t in range(tasks[i][2])] for i in range(len(tasks))]
 
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
     # Overlapping: check each pair of tasks to see if they are overlap time, u_i1j -> -u_i2j
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            if check_overlap(tasks[i], tasks[ip]):
-                for j in range(resources):
-                    sat_solver.add_clause([-u[i][j], -u[ip][j]])
-                    # print(f"Added clause D0: -u{i+1}{j+1} -u{ip+1}{j+1}")
-
-    # Symmetry breaking 1: Assign the tasks to resources if have r_max <= d_min (min of all tasks)
-    d_min = min(task[2] for task in tasks)
-    fixed_tasks = []
-    for i in range(len(tasks)):
-        if tasks[i][2] - tasks[i][1] <= d_min:
-            fixed_tasks.append(i)
+    for i, ip in pairs[must].tolist():
+        for j in range(resources):
+            sat_solver.add_clause([-u[i][j], -u[ip][j]])
+            # print(f"Added clause D0: -u{i+1}{j+1} -u{ip+1}{j+1}")
+
+    # Symmetry breaking 1: tasks whose compulsory parts [d - e, r + e) share a time point pairwise overlap, pin the largest such clique to resources 0..k-1
+    fixed_tasks = compulsory_clique(tasks)
     # Assign each task in fixed_tasks to a resource
     for j, i in enumerate(fixed_tasks):
         if j < resources:
             sat_solver.add_clause([u[i][j]])
         # print(f"Added clause S1: u{i+1}{j+1}")
+
+    # Last variable id in use, the symmetry breaking auxiliaries are numbered after it
+    top_id = len(tasks) * resources + len(tasks) * max_time
+
+    # Symmetry breaking 3: value precedence, resource j is only used once resource j-1 is used earlier in the task order
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        clauses, top_id = value_precedence_clauses(order, lambda i, j: [u[i][j]], resources, top_id)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order, equal starts use increasing resources
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        starts_by, clauses, top_id = started_by_literals(tasks, groups, lambda i, t: z[i][t], top_id)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+        clauses, top_id = identical_task_clauses(tasks, groups, starts_by, lambda i, j: [u[i][j]], resources, top_id)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
     
     # Symmetry breaking 2: if each task i has t in range(r_max, d_min), then z[i][t] = True
     # for j in range(resources):
@@ -131,12 +179,11 @@ def encode_problem_es3(tasks, resources):
         # print(f"Added clause D2: {clause_str}")
 
      # D3: A resource can only be held by one task at a time
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            for j in range(resources):
-                for t in range(tasks[i][0], min(tasks[i][2], tasks[ip][2])):
-                    sat_solver.add_clause([-z[i][t], -u[i][j], -z[ip][t], -u[ip][j]])
-                    # print(f"Added clause D3: -z{i+1}{t} -u{i+1}{j+1} -z{ip+1}{t} -u{ip+1}{j+1}")
+    for (i, ip), start, end in zip(pairs.tolist(), lo.tolist(), hi.tolist()):
+        for j in range(resources):
+            for t in range(start, end):
+                sat_solver.add_clause([-z[i][t], -u[i][j], -z[ip][t], -u[ip][j]])
+                # print(f"Added clause D3: -z{i+1}{t} -u{i+1}{j+1} -z{ip+1}{t} -u{ip+1}{j+1}")
     
     for i in range(len(tasks)):
         clause = []
@@ -177,9 +224,12 @@ def solve_with_timeout(tasks, resources, result_container, finished_event):
     
     try:
         u, z = encode_problem_es3(tasks, resources)
-        result = sat_solver.solve()
+        # Interruptible, so that a timed-out subproblem hands the solver back
+        result = sat_solver.solve_limited(expect_interrupt=True)
         
-        if result:
+        if result is None:
+            result_container['status'] = 'TIMEOUT'
+        elif result:
             model = sat_solver.get_model()
             result_container['status'] = 'SAT'
             result_container['model'] = model
@@ -212,7 +262,7 @@ def solve_es3(tasks, resources):
         sat_solver.interrupt()
         solver_thread.join()  # Wait for thread to clean up
         sat_solver.delete()
-        return "Time out", solve_time, 0, 0
+        return "Time out", solve_time, 0, 0, None
         
     if result_container.get('status') == 'SAT':
         model = result_container['model']
@@ -220,29 +270,53 @@ def solve_es3(tasks, resources):
         z = result_container['z']
         
         print("SAT")
-        for i in range(len(tasks)):
-            for j in range(resources):
-                if model[u[i][j] - 1] > 0:
-                    print_to_console_and_log(f"Task {i+1} is assigned to resource {j+1}")
-            for t in range(tasks[i][0], tasks[i][2]):
-                if model[z[i][t] - 1] > 0:
-                    print_to_console_and_log(f"Task {i+1} is accessing a resource at time {t}")
+        # Schedule for the report in input task ids and times
+        starts = decode_starts(tasks, model, z)
+        task_resource = [next(j for j in range(resources) if model[u[i][j] - 1] > 0) for i in range(len(tasks))]
         
         if not validate_solution(tasks, model, u, z, resources):
             sys.exit(1)
         
         sat_solver.delete()
-        return "SAT", solve_time, sat_solver.nof_vars(), sat_solver.nof_clauses()
+        return "SAT", solve_time, sat_solver.nof_vars(), sat_solver.nof_clauses(), (starts, task_resource)
     
     elif result_container.get('status') == 'UNSAT':
         print_to_console_and_log("UNSAT")
         sat_solver.delete()
-        return "UNSAT", solve_time, sat_solver.nof_vars(), sat_solver.nof_clauses()
+        return "UNSAT", solve_time, sat_solver.nof_vars(), sat_solver.nof_clauses(), None
     
     else:
         print_to_console_and_log(f"Error: {result_container.get('error')}")
         sat_solver.delete()
-        return "ERROR", solve_time, 0, 0
+        return "ERROR", solve_time, 0, 0, None
+
+def solve_component(tasks, resources, budget=None):
+    # Solve one independent component in a worker process of the decomposition stage, or one
+    # large-neighbourhood subproblem with its own time budget.
+    # Returns (result, starts, task_resource, variables, clauses) in component task indices
+    result_container = {}
+    finished_event = Event()
+
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+
+    if not finished_event.wait(timeout=time_budget if budget is None else budget):
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", None, None, 0, 0
+
+    num_variables, num_clauses = sat_solver.nof_vars(), sat_solver.nof_clauses()
+    sat_solver.delete()
+
+    if result_container.get('status') != 'SAT':
+        return result_container.get('status'), None, None, num_variables, num_clauses
+
+    model = result_container['model']
+    u = result_container['u']
+    starts = decode_starts(tasks, model, result_container['z'])
+    task_resource = [next(j for j in range(resources) if model[u[i][j] - 1] > 0) for i in range(len(tasks))]
+    return "SAT", starts, task_resource, num_variables, num_clauses
 
 def validate_solution(tasks, model, u, z, resources):
     task_resource = {}
@@ -290,6 +364,10 @@ def validate_solution(tasks, model, u, z, resources):
     print_to_console_and_log("Solution is valid!")
     return True
 
+def check_schedule(tasks, starts, task_resource, resources):
+    # Check a schedule from any pipeline stage with validate_solution, through the es3 u/z layout
+    return validate_solution(tasks, *schedule_to_model(tasks, starts, task_resource, resources), resources)
+
 def process_input_files(input_folder, resources=200):
     global id_counter, type
 
@@ -303,7 +381,8 @@ def process_input_files(input_folder, resources=200):
                 print(f"tasks: {tasks}")
 
             print_to_console_and_log(f"Processing {filename}...")
-            res, solve_time, num_variables, num_clauses = solve_es3(tasks, num_tasks)
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
             # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
             result_dict = {
                 "ID": id_counter,
@@ -312,16 +391,26 @@ def process_input_files(input_folder, resources=200):
                 "Time": solve_time,
                 "Result": res,
                 "Variables": num_variables,
-                "Clauses": num_clauses
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
             }
             write_to_xlsx(result_dict)
             id_counter += 1
 
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
     # return results
 
-# Main execution
-# input_folder = "input/" + sys.argv[1]
-input_folder = "input/small"
-process_input_files(input_folder)
+# Main execution, guarded so that the decomposition workers can import this module
+if __name__ == "__main__":
+    input_folder = "input/" + sys.argv[1]
+    # input_folder = "input/small"
+    process_input_files(input_folder)
 
-log_file.close()
\ No newline at end of file
+    log_file.close()
\ No newline at end of file
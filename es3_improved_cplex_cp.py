@@ -10,7 +10,24 @@ import time
 import os
 import ast
 
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_bounds, value_precedence_rows
+from symmetry import identical_task_groups, identical_task_pairs
+
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
 time_budget = 600  # Set your desired time budget in seconds
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
 type = "es3_improved_cplex_cp"
 id_counter = 1
 
@@ -97,25 +114,42 @@ def encode_problem_es3(tasks, resources):
         )
         intervals.append(interval)
 
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
     # Overlapping constraints (D0)
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            if check_overlap(tasks[i], tasks[ip]):
-                for j in range(resources):
-                    model.add(u[i][j] + u[ip][j] <= 1)
-                    constraint_count += 1
+    for i, ip in pairs[must].tolist():
+        for j in range(resources):
+            model.add(u[i][j] + u[ip][j] <= 1)
+            constraint_count += 1
 
     # Symmetry breaking 1 (S1)
-    d_min = min(task[2] for task in tasks)
-    fixed_tasks = []
-    for i in range(len(tasks)):
-        if tasks[i][2] - tasks[i][1] <= d_min:
-            fixed_tasks.append(i)
+    fixed_tasks = compulsory_clique(tasks)
     for j, i in enumerate(fixed_tasks):
         if j < resources:
             model.add(u[i][j] == 1)
             constraint_count += 1
 
+    # Symmetry breaking 3: value precedence, the task at position q of the task order only uses resources <= q (VP1),
+    # and resource j > 0 only once an earlier task uses resource j - 1 (VP2)
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        for i, j in value_precedence_bounds(order, resources):
+            model.add(u[i][j] == 0)
+            constraint_count += 1
+        for i, j, earlier in value_precedence_rows(order, resources):
+            model.add(u[i][j] <= sum(u[k][j - 1] for k in earlier))
+            constraint_count += 1
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        for a, b in identical_task_pairs(groups):
+            r, e, d = tasks[a]
+            model.add(sum(t * z[a][t] for t in range(r, d)) <= sum(t * z[b][t] for t in range(r, d)))
+            constraint_count += 1
+
     # Symmetry breaking 2 (S2)
     for i in range(len(tasks)):
         for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
@@ -129,12 +163,11 @@ def encode_problem_es3(tasks, resources):
         constraint_count += 1
 
     # D3: Resource conflicts
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            for j in range(resources):
-                for t in range(tasks[i][0], min(tasks[i][2], tasks[ip][2])):
-                    model.add(z[i][t] + u[i][j] + z[ip][t] + u[ip][j] <= 3)
-                    constraint_count += 1
+    for (i, ip), start, end in zip(pairs.tolist(), lo.tolist(), hi.tolist()):
+        for j in range(resources):
+            for t in range(start, end):
+                model.add(z[i][t] + u[i][j] + z[ip][t] + u[ip][j] <= 3)
+                constraint_count += 1
 
     # C3: Task must start within its time window
     for i in range(len(tasks)):
@@ -221,7 +254,7 @@ def solve_es3(tasks, resources):
     if not finished:
         solver_thread.join()  # Wait for thread to clean up
         print_to_console_and_log("Time out")
-        return "Time out", solve_time, 0, 0
+        return "Time out", solve_time, 0, 0, None
         
     if result_container.get('status') == 'SAT':
         solution = result_container['solution']
@@ -230,27 +263,22 @@ def solve_es3(tasks, resources):
         
         print_to_console_and_log("Solution found")
         
-        # Print solution details
-        for i in range(len(tasks)):
-            interval = intervals[i]
-            start_time = solution.get_var_solution(interval).get_start()
-            for j in range(resources):
-                if solution.get_value(u[i][j]) > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is assigned to resource {j+1}")
-                    print_to_console_and_log(f"Task {i+1} starts at time {start_time}")
+        # Schedule for the report in input task ids and times
+        starts = [solution.get_var_solution(intervals[i]).get_start() for i in range(len(tasks))]
+        task_resource = [next(j for j in range(resources) if solution.get_value(u[i][j]) > 0.5) for i in range(len(tasks))]
         
         if not validate_solution(tasks, solution, u, intervals, resources):
             sys.exit(1)
             
-        return "SAT", solve_time, result_container['num_variables'], result_container['constraint_count']
+        return "SAT", solve_time, result_container['num_variables'], result_container['constraint_count'], (starts, task_resource)
     
     elif result_container.get('status') == 'UNSAT':
         print_to_console_and_log("No solution found")
-        return "UNSAT", solve_time, result_container['num_variables'], result_container['constraint_count']
+        return "UNSAT", solve_time, result_container['num_variables'], result_container['constraint_count'], None
     
     else:
         print_to_console_and_log(f"Error: {result_container.get('error')}")
-        return "ERROR", solve_time, 0, 0
+        return "ERROR", solve_time, 0, 0, None
 
 def validate_solution(tasks, solution, u, intervals, resources):
     task_resource = {}
@@ -310,7 +338,8 @@ def process_input_files(input_folder, resources=200):
                 print(f"tasks: {tasks}")
 
             print_to_console_and_log(f"Processing {filename}...")
-            res, solve_time, num_variables, num_constraints = solve_es3(tasks, num_tasks)
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_constraints, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
             # res, solve_time, num_variables, num_constraints = solve_es3(tasks, resources)
             result_dict = {
                 "ID": id_counter,
@@ -319,11 +348,20 @@ def process_input_files(input_folder, resources=200):
                 "Time": solve_time,
                 "Result": res,
                 "Variables": num_variables,
-                "Clauses": num_constraints
+                "Clauses": num_constraints,
+                "Method": method,
+                "Class": instance
             }
             write_to_xlsx(result_dict)
             id_counter += 1
 
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
     # return results
 
 # Main execution
@@ -15,8 +15,25 @@ import ast
 import gurobipy as gp
 from gurobipy import GRB
 
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_bounds, value_precedence_rows
+from symmetry import identical_task_groups, identical_task_pairs
+
 sat_solver = Glucose3
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
 time_budget = 600  # Set your desired time budget in seconds
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
 type = "es3_improved_SB"
 id_counter = 1
 
@@ -96,23 +113,37 @@ def encode_problem_es3(tasks, resources):
     # Update model to include new variables
     model.update()
 
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
     # Overlapping constraints
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            if check_overlap(tasks[i], tasks[ip]):
-                for j in range(resources):
-                    model.addConstr(u[i,j] + u[ip,j] <= 1)
+    for i, ip in pairs[must].tolist():
+        for j in range(resources):
+            model.addConstr(u[i,j] + u[ip,j] <= 1)
 
     # Symmetry breaking 1
-    d_min = min(task[2] for task in tasks)
-    fixed_tasks = []
-    for i in range(len(tasks)):
-        if tasks[i][2] - tasks[i][1] <= d_min:
-            fixed_tasks.append(i)
+    fixed_tasks = compulsory_clique(tasks)
     for j, i in enumerate(fixed_tasks):
         if j < resources:
             model.addConstr(u[i,j] == 1)
 
+    # Symmetry breaking 3: value precedence, the task at position q of the task order only uses resources <= q (VP1),
+    # and resource j > 0 only once an earlier task uses resource j - 1 (VP2)
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        for i, j in value_precedence_bounds(order, resources):
+            model.addConstr(u[i,j] == 0)
+        for i, j, earlier in value_precedence_rows(order, resources):
+            model.addConstr(u[i,j] <= gp.quicksum(u[k,j-1] for k in earlier))
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        for a, b in identical_task_pairs(groups):
+            r, e, d = tasks[a]
+            model.addConstr(gp.quicksum(t * z[a,t] for t in range(r, d)) <= gp.quicksum(t * z[b,t] for t in range(r, d)))
+
     # Symmetry breaking 2
     for i in range(len(tasks)):
         for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
@@ -132,11 +163,10 @@ def encode_problem_es3(tasks, resources):
         model.addConstr(gp.quicksum(u[i,j] for j in range(resources)) == 1)
 
     # D3: Resource conflicts
-    for i in range(len(tasks)):
-        for ip in range(i + 1, len(tasks)):
-            for j in range(resources):
-                for t in range(max(tasks[i][0], tasks[ip][0]), min(tasks[i][2], tasks[ip][2])):
-                    model.addConstr(z[i,t] + u[i,j] + z[ip,t] + u[ip,j] <= 3)
+    for (i, ip), start, end in zip(pairs.tolist(), lo.tolist(), hi.tolist()):
+        for j in range(resources):
+            for t in range(start, end):
+                model.addConstr(z[i,t] + u[i,j] + z[ip,t] + u[ip,j] <= 3)
 
     # C3: Non-preemptive resource access
     for i in range(len(tasks)):
@@ -249,11 +279,11 @@ def solve_es3(tasks, resources):
     solve_time = time.time() - start_time
     
     if not finished:
-        return "TIMEOUT", solve_time, 0, 0
+        return "TIMEOUT", solve_time, 0, 0, None
     
     if result_container.get('status') == 'ERROR':
         print_to_console_and_log(f"Error: {result_container.get('error')}")
-        return "ERROR", solve_time, 0, 0
+        return "ERROR", solve_time, 0, 0, None
         
     model = result_container['model']
     u = result_container['u']
@@ -277,18 +307,16 @@ def solve_es3(tasks, resources):
         print_to_console_and_log(f"Unexpected status: {model.Status}")
         res = "UNKNOWN"
         
+    schedule = None
     if res == "SAT":
-        for i in range(len(tasks)):
-            for j in range(resources):
-                if u[i,j].X > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is assigned to resource {j+1}")
-            for t in range(tasks[i][0], tasks[i][2]):
-                if z[i,t].X > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is accessing a resource at time {t}")
+        # Schedule for the report in input task ids and times
+        starts = [next(t for t in range(tasks[i][0], tasks[i][2]) if z[i,t].X > 0.5) for i in range(len(tasks))]
+        task_resource = [next(j for j in range(resources) if u[i,j].X > 0.5) for i in range(len(tasks))]
+        schedule = (starts, task_resource)
         if not validate_solution(tasks, model, u, z, resources):
             sys.exit(1)
             
-    return res, solve_time, num_variables, num_constraints
+    return res, solve_time, num_variables, num_constraints, schedule
     
 def process_input_files(input_folder, resources=200):
     global id_counter, type
@@ -303,7 +331,8 @@ def process_input_files(input_folder, resources=200):
                 print(f"tasks: {tasks}")
 
             print_to_console_and_log(f"Processing {filename}...")
-            res, solve_time, num_variables, num_constraints = solve_es3(tasks, num_tasks)
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_constraints, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
             # res, solve_time, num_variables, num_constraints = solve_es3(tasks, resources)
             result_dict = {
                 "ID": id_counter,
@@ -312,11 +341,20 @@ def process_input_files(input_folder, resources=200):
                 "Time": solve_time,
                 "Result": res,
                 "Variables": num_variables,
-                "Clauses": num_constraints
+                "Clauses": num_constraints,
+                "Method": method,
+                "Class": instance
             }
             write_to_xlsx(result_dict)
             id_counter += 1
 
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
     # return results
 
 # Main execution
@@ -8,8 +8,20 @@ from ortools.linear_solver import pywraplp
 from itertools import product
 import os
 import ast
+
+from bounds import flow_filter_stats
+from engines import engine_stats
+from pipeline import solve_instance
 import time
 
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
 time_budget = 600  # Set your desired time budget in seconds
 type = "es3_mip"
 id_counter = 1
@@ -202,7 +214,7 @@ def solve_es3(tasks, resources):
     start_time = time.time()
     solver, u, z, y = encode_problem_es3(tasks, resources)
     if not solver:
-        return "ERROR", 0, 0, 0
+        return "ERROR", 0, 0, 0, None
 
     solver.set_time_limit(time_budget * 1000)  # Set time limit in milliseconds
 
@@ -217,16 +229,14 @@ def solve_es3(tasks, resources):
     print_to_console_and_log(f"Num of variables: {num_variables}")
     print_to_console_and_log(f"Num of constraints: {num_constraints}")
 
+    schedule = None
     if status == pywraplp.Solver.OPTIMAL or status == pywraplp.Solver.FEASIBLE:
         print_to_console_and_log("Solution found.")
         res = "SAT"
-        for i in range(len(tasks)):
-            for j in range(resources):
-                if u[i, j].solution_value() > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is assigned to resource {j+1}")
-            for t in range(tasks[i][0], tasks[i][2]):
-                if z[i, t].solution_value() > 0.5:
-                    print_to_console_and_log(f"Task {i+1} is accessing a resource at time {t}")
+        # Schedule for the report in input task ids and times
+        starts = [next(t for t in range(tasks[i][0], tasks[i][2]) if z[i, t].solution_value() > 0.5) for i in range(len(tasks))]
+        task_resource = [next(j for j in range(resources) if u[i, j].solution_value() > 0.5) for i in range(len(tasks))]
+        schedule = (starts, task_resource)
         if not validate_solution(tasks, solver, u, z, y, resources):
             sys.exit(1)
     elif status == pywraplp.Solver.INFEASIBLE:
@@ -236,7 +246,7 @@ def solve_es3(tasks, resources):
         print_to_console_and_log("Solver timed out.")
         res = "TIMEOUT"
 
-    return res, solve_time, num_variables, num_constraints
+    return res, solve_time, num_variables, num_constraints, schedule
 
 def process_input_files(input_folder, resources=200):
     global id_counter, type
@@ -251,7 +261,8 @@ def process_input_files(input_folder, resources=200):
                 print(f"tasks: {tasks}")
 
             print_to_console_and_log(f"Processing {filename}...")
-            res, solve_time, num_variables, num_clauses = solve_es3(tasks, num_tasks)
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
             # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
 
             result_dict = {
@@ -261,11 +272,20 @@ def process_input_files(input_folder, resources=200):
                 "Time": solve_time,
                 "Result": res,
                 "Variables": num_variables,
-                "Clauses": num_clauses
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
             }
             write_to_xlsx(result_dict)
             id_counter += 1
 
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
     # return results
 
 # Main execution
@@ -0,0 +1,454 @@
+import sys
+import pandas as pd
+from datetime import datetime
+from openpyxl import load_workbook, Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from zipfile import BadZipFile
+
+# from pysat.formula import CNF
+from pysat.solvers import Glucose3, Solver
+from itertools import product
+import math
+import time
+from threading import Thread, Event
+import os
+import ast
+
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from resource_decoder import decode_starts, schedule_to_model
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_clauses
+from symmetry import identical_task_groups, started_by_literals, identical_task_clauses
+
+sat_solver = Glucose3
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
+amo_encoding = "ladder"  # At-most-one encoding per (resource, time) cell: "ladder", "commander" or "bimander"
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
+time_budget = 600  # Set your desired time budget in seconds
+type = f"es3_occupancy_{amo_encoding}"
+id_counter = 1
+id_variable: int
+
+# Open the log file in append mode
+log_file = open('console.log', 'a')
+
+def write_to_xlsx(result_dict):
+    # Append the result to a list
+    excel_results = []
+    excel_results.append(result_dict)
+
+    output_path =  'out/'
+
+    # Write the results to an Excel file
+    if not os.path.exists(output_path): os.makedirs(output_path)
+
+    df = pd.DataFrame(excel_results)
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    excel_file_path = f"{output_path}/results_{current_date}.xlsx"
+
+    # Check if the file already exists
+    if os.path.exists(excel_file_path):
+        try:
+            book = load_workbook(excel_file_path)
+        except BadZipFile:
+            book = Workbook()  # Create a new workbook if the file is not a valid Excel file
+
+        # Check if the 'Results' sheet exists
+        if 'Results' not in book.sheetnames:
+            book.create_sheet('Results')  # Create 'Results' sheet if it doesn't exist
+
+        sheet = book['Results']
+        for row in dataframe_to_rows(df, index=False, header=False): sheet.append(row)
+        book.save(excel_file_path)
+
+    else: df.to_excel(excel_file_path, index=False, sheet_name='Results', header=False)
+
+    print_to_console_and_log(f"Result added to Excel file: {os.path.abspath(excel_file_path)}\n")
+
+
+# Define a custom print function that writes to both console and log file
+def print_to_console_and_log(*args, **kwargs):
+    print(*args, **kwargs)
+    print(*args, file = log_file, **kwargs)
+    log_file.flush()
+
+def check_overlap(task1, task2):
+    # Suppose: task1 = (r1, e1, d1), task2 = (r2, e2, d2)
+    # r1_min = r1, r1_max = d1 - e1, d1_min = r1 + e1, d1_max = d1
+    # r2_min = r2, r2_max = d2 - e2, d2_min = r2 + e2, d2_max = d2
+    # task1 and task2 are overlapped if: 
+    # 1. d2_min >= r1_max and r2_max <= d1_min
+    # 2. d1_min >= r2_max and r1_max <= d2_min
+    # => r2 + e2 >= d1 - e1 and d2 - e2 <= r1 + e1 or r1 + e1 >= d2 - e2 and d1 - e1 <= r2 + e2
+    if task2[0] + task2[1] > task1[2] - task1[1] and task2[2] - task2[1] < task1[0] + task1[1]:
+        return True
+    if task1[0] + task1[1] > task2[2] - task2[1] and task1[2] - task1[1] < task2[0] + task2[1]:
+        return True
+    return False
+
+def new_var():
+    global id_variable
+    id_variable += 1
+    return id_variable
+
+def at_most_one_pairwise(var):
+    for a in range(len(var)):
+        for b in range(a + 1, len(var)):
+            sat_solver.add_clause([-var[a], -var[b]])
+
+def at_most_one_ladder(var):
+    # Sequential (ladder) AMO: r_k <-> some of var[0..k] is true, var[k] -> -r_{k-1}
+    prev = None
+    for k in range(len(var) - 1):
+        r = new_var()
+        sat_solver.add_clause([-var[k], r])
+        if prev is not None:
+            sat_solver.add_clause([-prev, r])
+            sat_solver.add_clause([-var[k], -prev])
+        prev = r
+    sat_solver.add_clause([-var[-1], -prev])
+
+def at_most_one_commander(var, group_size=3):
+    # Commander AMO: pairwise inside groups, x -> c_group, then AMO over the commanders recursively
+    if len(var) <= group_size + 1:
+        at_most_one_pairwise(var)
+        return
+    commanders = []
+    for g in range(0, len(var), group_size):
+        group = var[g:g + group_size]
+        at_most_one_pairwise(group)
+        c = new_var()
+        for x in group:
+            sat_solver.add_clause([-x, c])
+        commanders.append(c)
+    at_most_one_commander(commanders, group_size)
+
+def at_most_one_bimander(var):
+    # Bimander AMO: pairwise inside ~sqrt(n) groups, every literal of group g forces the binary code of g
+    num_groups = math.ceil(math.sqrt(len(var)))
+    group_size = math.ceil(len(var) / num_groups)
+    num_bits = max(1, math.ceil(math.log2(num_groups)))
+    bits = [new_var() for _ in range(num_bits)]
+    for g in range(num_groups):
+        group = var[g * group_size:(g + 1) * group_size]
+        at_most_one_pairwise(group)
+        for x in group:
+            for h in range(num_bits):
+                sat_solver.add_clause([-x, bits[h] if (g >> h) & 1 else -bits[h]])
+
+def at_most_one(var):
+    if len(var) < 2:
+        return
+    if amo_encoding == "ladder":
+        at_most_one_ladder(var)
+    elif amo_encoding == "commander":
+        at_most_one_commander(var)
+    elif amo_encoding == "bimander":
+        at_most_one_bimander(var)
+    else:
+        raise ValueError(f"Unknown at-most-one encoding: {amo_encoding}")
+
+def encode_problem_es3(tasks, resources):
+    global id_variable
+    max_time = max(task[2] for task in tasks)
+
+    # Variables u[i][j] for task i accessing resource j
+    u = [[i * resources + j + 1 for j in range(resources)] for i in range(len(tasks))]
+
+    # Variables z[i][t] for task i accessing some resource at time t
+    z = [[len(tasks) * resources + i * max_time + t + 1 for t in range(tasks[i][2])] for i in range(len(tasks))]
+
+    # Calculate id_variable
+    id_variable = len(tasks) * resources + len(tasks) * max_time
+
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
+    # Overlapping: check each pair of tasks to see if they are overlap time, u_i1j -> -u_i2j
+    for i, ip in pairs[must].tolist():
+        for j in range(resources):
+            sat_solver.add_clause([-u[i][j], -u[ip][j]])
+            # print(f"Added clause D0: -u{i+1}{j+1} -u{ip+1}{j+1}")
+
+    # Symmetry breaking 1: tasks whose compulsory parts [d - e, r + e) share a time point pairwise overlap, pin the largest such clique to resources 0..k-1
+    fixed_tasks = compulsory_clique(tasks)
+    # Assign each task in fixed_tasks to a resource
+    for j, i in enumerate(fixed_tasks):
+        if j < resources:
+            sat_solver.add_clause([u[i][j]])
+        # print(f"Added clause S1: u{i+1}{j+1}")
+
+    # Symmetry breaking 3: value precedence, resource j is only used once resource j-1 is used earlier in the task order
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        clauses, id_variable = value_precedence_clauses(order, lambda i, j: [u[i][j]], resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order, equal starts use increasing resources
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        starts_by, clauses, id_variable = started_by_literals(tasks, groups, lambda i, t: z[i][t], id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+        clauses, id_variable = identical_task_clauses(tasks, groups, starts_by, lambda i, j: [u[i][j]], resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+    
+    # Symmetry breaking 2: if each task i has t in range(r_max, d_min), then z[i][t] = True
+    # for j in range(resources):
+    for i in range(len(tasks)):
+        for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([z[i][t]])
+            # print(f"Added clause S2: -u{i+1}{j+1}, z{i+1}{t}")
+
+    # D1: Task i should not access two resources at the same time
+    for i in range(len(tasks)):
+        for j in range(resources):
+            for jp in range(j + 1, resources):
+                sat_solver.add_clause([-u[i][j], -u[i][jp]])
+                # print(f"Added clause D1: -u{i+1}{j+1} -u{i+1}{jp+1}")
+
+    # D2: Each task must get some resource
+    for i in range(len(tasks)):
+        # sat_solver.add_clause([u[i][j] for j in range(resources)])
+        # print(f"Added clause: u{i}0 u{i}1")
+        clause = []
+        clause_str = []
+        for j in range(resources):
+            clause.append(u[i][j])
+            clause_str.append(f"u{i+1}{j+1}")
+        sat_solver.add_clause(clause)
+        # print(f"Added clause D2: {clause_str}")
+
+    # D3: A resource can only be held by one task at a time
+    # Variables y[j][t][i] for task i occupying resource j at time t, only for t inside task i's window
+    # and only for time steps where at least two windows meet: z[i][t] ^ u[i][j] -> y[j][t][i]
+    for t in range(max_time):
+        cell_tasks = [i for i in range(len(tasks)) if tasks[i][0] <= t < tasks[i][2]]
+        if len(cell_tasks) < 2:
+            continue
+        for j in range(resources):
+            y = []
+            for i in cell_tasks:
+                y.append(new_var())
+                sat_solver.add_clause([-z[i][t], -u[i][j], y[-1]])
+                # print(f"Added clause D31: -z{i+1}{t} -u{i+1}{j+1} y{j+1}{t}{i+1}")
+            # At most one task occupies resource j at time t
+            at_most_one(y)
+
+    for i in range(len(tasks)):
+        clause = []
+        clause_str = []
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1] + 1):
+            clause.append(z[i][t])
+            clause_str.append(f"z{i+1}{t}")
+        sat_solver.add_clause(clause)
+        # print(f"Added clause C3: {clause_str}")
+
+    # check each pair z_i^t and z_i^t+1, if u_ij ^ -z_i^t ^ z_i^t+1 -> ^ z_list[j]
+    for i in range(len(tasks)):
+        for t in range(tasks[i][0] + 1, tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], z[i][t]])
+            # print(f"Added clause C41: -z{i+1}{tasks[i][0]} z{i+1}{t}")
+
+        for t in range (tasks[i][0] + tasks[i][1], tasks[i][2]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], -z[i][t]])
+            # print(f"Added clause C42: -z{i+1}{tasks[i][0]} -z{i+1}{t}")
+
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1]):
+            for tpp in range(t+1, t + tasks[i][1] + 1):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], z[i][tpp]])
+                    # print(f"Added clause C51: z{i+1}{t}, -z{i+1}{t+1}, z{i+1}{tpp}")
+
+            for tpp in range(t + tasks[i][1] + 1, tasks[i][2]):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], -z[i][tpp]])
+                    # print(f"Added clause C52: z{i+1}{t}, -z{i+1}{t+1}, -z{i+1}{tpp}")
+
+    # sat_solver.add_clause([z[1][3]])
+    return u, z
+
+def solve_with_timeout(tasks, resources, result_container, finished_event):
+    global sat_solver
+    sat_solver = Glucose3()
+    
+    try:
+        u, z = encode_problem_es3(tasks, resources)
+        # Interruptible, so that solve_es3 can stop the search at the time budget
+        result = sat_solver.solve_limited(expect_interrupt=True)
+        
+        if result is None:
+            result_container['status'] = 'TIMEOUT'
+        elif result:
+            model = sat_solver.get_model()
+            result_container['status'] = 'SAT'
+            result_container['model'] = model
+            result_container['u'] = u
+            result_container['z'] = z
+        else:
+            result_container['status'] = 'UNSAT'
+            
+    except Exception as e:
+        result_container['status'] = 'ERROR'
+        result_container['error'] = str(e)
+    
+    finished_event.set()
+
+def solve_es3(tasks, resources):
+    global sat_solver
+    
+    result_container = {}
+    finished_event = Event()
+    
+    start_time = time.time()
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+    
+    # Wait for either completion or timeout
+    finished = finished_event.wait(timeout=time_budget)
+    solve_time = time.time() - start_time
+    
+    if not finished:
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", solve_time, 0, 0, None
+        
+    if result_container.get('status') == 'SAT':
+        model = result_container['model']
+        u = result_container['u']
+        z = result_container['z']
+        
+        print("SAT")
+        # Schedule for the report in input task ids and times
+        starts = decode_starts(tasks, model, z)
+        task_resource = [next(j for j in range(resources) if model[u[i][j] - 1] > 0) for i in range(len(tasks))]
+        
+        if not validate_solution(tasks, model, u, z, resources):
+            sys.exit(1)
+        
+        num_variables = sat_solver.nof_vars()
+        num_clauses = sat_solver.nof_clauses()
+        sat_solver.delete()
+        return "SAT", solve_time, num_variables, num_clauses, (starts, task_resource)
+    
+    elif result_container.get('status') == 'UNSAT':
+        print_to_console_and_log("UNSAT")
+        num_variables = sat_solver.nof_vars()
+        num_clauses = sat_solver.nof_clauses()
+        sat_solver.delete()
+        return "UNSAT", solve_time, num_variables, num_clauses, None
+    
+    else:
+        print_to_console_and_log(f"Error: {result_container.get('error')}")
+        sat_solver.delete()
+        return "ERROR", solve_time, 0, 0, None
+
+def validate_solution(tasks, model, u, z, resources):
+    task_resource = {}
+    task_times = {}
+    resource_usage = {j: [] for j in range(resources)}
+
+    for i, task in enumerate(tasks):
+        for j in range(resources):
+            if model[u[i][j] - 1] > 0:
+                task_resource[i] = j
+        
+        task_times[i] = [t for t in range(task[0], task[2]) if model[z[i][t] - 1] > 0]
+        
+        if task_resource.get(i) is not None:
+            resource_usage[task_resource[i]].extend(task_times[i])
+
+    # Check constraints
+    for i, task in enumerate(tasks):
+        # Check if task is assigned to exactly one resource
+        if i not in task_resource:
+            print_to_console_and_log(f"Error: Task {i} is not assigned to any resource")
+            return False
+
+        # Check if task starts after its release time
+        if task_times[i][0] < task[0]:
+            print_to_console_and_log(f"Error: Task {i+1} starts before its release time")
+            return False
+
+        # Check if task finishes before its deadline
+        if task_times[i][-1] >= task[2]:
+            print_to_console_and_log(f"Error: Task {i+1} finishes after its deadline")
+            return False
+
+        # Check if task execution is continuous and matches the execution time
+        if len(task_times[i]) != task[1] or any(task_times[i][j+1] - task_times[i][j] != 1 for j in range(len(task_times[i])-1)):
+            print_to_console_and_log(f"Error: Task {i+1} execution is not continuous or doesn't match execution time")
+            return False
+
+    # Check if any resource is used by multiple tasks at the same time
+    for j, times in resource_usage.items():
+        if len(times) != len(set(times)):
+            print_to_console_and_log(f"Error: Resource {j+1} is used by multiple tasks at the same time")
+            return False
+
+    print_to_console_and_log("Solution is valid!")
+    return True
+
+def check_schedule(tasks, starts, task_resource, resources):
+    # Check a schedule from any pipeline stage with validate_solution, through the es3 u/z layout
+    return validate_solution(tasks, *schedule_to_model(tasks, starts, task_resource, resources), resources)
+
+def process_input_files(input_folder, resources=200):
+    global id_counter, type
+
+    # results = {}
+    for filename in os.listdir(input_folder):
+        if filename.endswith(".txt"):
+            file_path = os.path.join(input_folder, filename)
+            with open(file_path, 'r') as f:
+                num_tasks = int(f.readline().strip())
+                tasks = ast.literal_eval(f.readline().strip())
+                print(f"tasks: {tasks}")
+
+            print_to_console_and_log(f"Processing {filename}...")
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
+            # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
+            result_dict = {
+                "ID": id_counter,
+                "Problem": os.path.basename(filename),
+                "Type": type,
+                "Time": solve_time,
+                "Result": res,
+                "Variables": num_variables,
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
+            }
+            write_to_xlsx(result_dict)
+            id_counter += 1
+
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
+    # return results
+
+# Main execution
+input_folder = "input/" + sys.argv[1]
+# input_folder = "input/large"
+process_input_files(input_folder)
+
+log_file.close()
\ No newline at end of file
@@ -0,0 +1,456 @@
+import sys
+import pandas as pd
+from datetime import datetime
+from openpyxl import load_workbook, Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from zipfile import BadZipFile
+
+# from pysat.formula import CNF
+from pysat.solvers import Glucose3, Solver
+from itertools import product
+import math
+import time
+from threading import Thread, Event
+import os
+import ast
+
+from bounds import flow_filter_stats
+from engines import engine_stats
+from conflict import conflict_graph
+from pipeline import solve_instance
+from resource_decoder import decode_starts, schedule_to_model
+from symmetry import compulsory_clique, value_precedence_order, value_precedence_clauses
+from symmetry import identical_task_groups, started_by_literals, identical_task_clauses
+
+sat_solver = Glucose3
+value_precedence = True  # Symmetry breaking 3: value precedence over the identical resources
+identical_tasks = True  # Symmetry breaking 4: lexicographic order on tasks with identical (r, e, d)
+resource_encoding = "log"  # Encoding of the resource index of a task: "direct", "order" or "log"
+cap_resources = True  # Cap the resource count at the window-overlap clique number
+normalisation = True  # Shift, scale and sort the tasks canonically before encoding
+window_tightening = True  # Tighten the task windows by propagation before encoding
+infeasibility_checks = True  # Prove UNSAT by the compulsory-overlap, energy and preemptive-flow checks before encoding
+bounding = False  # Decide SAT instances from the window-clique and EDF bounds before encoding
+special_engines = False  # Route unit-time and single-resource instances to dedicated engines
+engine_budget = 30  # Time budget of the single-resource branch-and-bound in seconds
+heuristic = False  # Try insertion scheduling with randomised restarts before encoding
+time_budget = 600  # Set your desired time budget in seconds
+type = f"es3_resource_{resource_encoding}"
+id_counter = 1
+id_variable: int
+
+# Open the log file in append mode
+log_file = open('console.log', 'a')
+
+def write_to_xlsx(result_dict):
+    # Append the result to a list
+    excel_results = []
+    excel_results.append(result_dict)
+
+    output_path =  'out/'
+
+    # Write the results to an Excel file
+    if not os.path.exists(output_path): os.makedirs(output_path)
+
+    df = pd.DataFrame(excel_results)
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    excel_file_path = f"{output_path}/results_{current_date}.xlsx"
+
+    # Check if the file already exists
+    if os.path.exists(excel_file_path):
+        try:
+            book = load_workbook(excel_file_path)
+        except BadZipFile:
+            book = Workbook()  # Create a new workbook if the file is not a valid Excel file
+
+        # Check if the 'Results' sheet exists
+        if 'Results' not in book.sheetnames:
+            book.create_sheet('Results')  # Create 'Results' sheet if it doesn't exist
+
+        sheet = book['Results']
+        for row in dataframe_to_rows(df, index=False, header=False): sheet.append(row)
+        book.save(excel_file_path)
+
+    else: df.to_excel(excel_file_path, index=False, sheet_name='Results', header=False)
+
+    print_to_console_and_log(f"Result added to Excel file: {os.path.abspath(excel_file_path)}\n")
+
+
+# Define a custom print function that writes to both console and log file
+def print_to_console_and_log(*args, **kwargs):
+    print(*args, **kwargs)
+    print(*args, file = log_file, **kwargs)
+    log_file.flush()
+
+def check_overlap(task1, task2):
+    # Suppose: task1 = (r1, e1, d1), task2 = (r2, e2, d2)
+    # r1_min = r1, r1_max = d1 - e1, d1_min = r1 + e1, d1_max = d1
+    # r2_min = r2, r2_max = d2 - e2, d2_min = r2 + e2, d2_max = d2
+    # task1 and task2 are overlapped if: 
+    # 1. d2_min >= r1_max and r2_max <= d1_min
+    # 2. d1_min >= r2_max and r1_max <= d2_min
+    # => r2 + e2 >= d1 - e1 and d2 - e2 <= r1 + e1 or r1 + e1 >= d2 - e2 and d1 - e1 <= r2 + e2
+    if task2[0] + task2[1] > task1[2] - task1[1] and task2[2] - task2[1] < task1[0] + task1[1]:
+        return True
+    if task1[0] + task1[1] > task2[2] - task2[1] and task1[2] - task1[1] < task2[0] + task2[1]:
+        return True
+    return False
+
+def new_var():
+    global id_variable
+    id_variable += 1
+    return id_variable
+
+def resource_literals(code, j, resources):
+    # Conjunction of literals meaning "the task holding this code uses resource j"
+    if resource_encoding == "direct":
+        return [code[j]]
+    if resource_encoding == "order":
+        # code[k] <-> resource index > k
+        literals = []
+        if j > 0:
+            literals.append(code[j - 1])
+        if j < resources - 1:
+            literals.append(-code[j])
+        return literals
+    # log: code[k] is bit k of the resource index
+    return [code[k] if (j >> k) & 1 else -code[k] for k in range(len(code))]
+
+def encode_resource_index(tasks, resources):
+    # Returns code[i], the literals encoding the resource index of task i, and adds their domain constraints
+    code = []
+    for i in range(len(tasks)):
+        if resource_encoding == "direct":
+            # Variables u[i][j] for task i accessing resource j
+            code.append([new_var() for j in range(resources)])
+
+            # D1: Task i should not access two resources at the same time
+            for j in range(resources):
+                for jp in range(j + 1, resources):
+                    sat_solver.add_clause([-code[i][j], -code[i][jp]])
+                    # print(f"Added clause D1: -u{i+1}{j+1} -u{i+1}{jp+1}")
+
+            # D2: Each task must get some resource
+            sat_solver.add_clause(code[i])
+            # print(f"Added clause D2: u{i+1}1 ... u{i+1}{resources}")
+
+        elif resource_encoding == "order":
+            # Variables o[i][k] for the resource index of task i being greater than k
+            code.append([new_var() for k in range(resources - 1)])
+
+            # R1: index > k+1 -> index > k
+            for k in range(resources - 2):
+                sat_solver.add_clause([-code[i][k+1], code[i][k]])
+                # print(f"Added clause R1: -o{i+1}{k+2} o{i+1}{k+1}")
+
+        elif resource_encoding == "log":
+            # Variables b[i][k] for bit k of the resource index of task i
+            code.append([new_var() for k in range(math.ceil(math.log2(resources)) if resources > 1 else 0)])
+
+            # R2: Forbid the binary codes of resources >= `resources`
+            for j in range(resources, 2 ** len(code[i])):
+                sat_solver.add_clause([-lit for lit in resource_literals(code[i], j, resources)])
+                # print(f"Added clause R2: task {i+1} not on resource {j+1}")
+
+        else:
+            raise ValueError(f"Unknown resource encoding: {resource_encoding}")
+
+    return code
+
+def codes_differ(code_i, code_ip, eq=None):
+    # Some bit differs between the two codes, unless the (optional) equality literal eq holds:
+    # eq v diff_0 v ... v diff_k, with diff_k -> code_i[k] xor code_ip[k]
+    clause = [] if eq is None else [eq]
+    for k in range(len(code_i)):
+        diff = new_var()
+        sat_solver.add_clause([-diff, code_i[k], code_ip[k]])
+        sat_solver.add_clause([-diff, -code_i[k], -code_ip[k]])
+        clause.append(diff)
+    sat_solver.add_clause(clause)
+
+def encode_problem_es3(tasks, resources):
+    global id_variable
+    max_time = max(task[2] for task in tasks)
+
+    # Variables z[i][t] for task i accessing some resource at time t
+    z = [[i * max_time + t + 1 for t in range(tasks[i][2])] for i in range(len(tasks))]
+
+    # Calculate id_variable
+    id_variable = len(tasks) * max_time
+
+    # Resource index of every task, with D1/D2 for the direct encoding
+    code = encode_resource_index(tasks, resources)
+
+    # Conflict graph: pairs of tasks with intersecting windows, their common range [lo, hi) and the must-overlap pairs
+    pairs, lo, hi, must = conflict_graph(tasks)
+
+    # Overlapping: check each pair of tasks to see if they are overlap time
+    for i, ip in pairs[must].tolist():
+        if resource_encoding == "direct":
+            for j in range(resources):
+                sat_solver.add_clause([-code[i][j], -code[ip][j]])
+                # print(f"Added clause D0: -u{i+1}{j+1} -u{ip+1}{j+1}")
+        else:
+            # D0: the two resource codes must differ
+            codes_differ(code[i], code[ip])
+            # print(f"Added clause D0: code{i+1} != code{ip+1}")
+
+    # Symmetry breaking 1: tasks whose compulsory parts [d - e, r + e) share a time point pairwise overlap, pin the largest such clique to resources 0..k-1
+    fixed_tasks = compulsory_clique(tasks)
+    # Assign each task in fixed_tasks to a resource
+    for j, i in enumerate(fixed_tasks):
+        if j < resources:
+            for lit in resource_literals(code[i], j, resources):
+                sat_solver.add_clause([lit])
+        # print(f"Added clause S1: task {i+1} on resource {j+1}")
+
+    # Symmetry breaking 3: value precedence, resource j is only used once resource j-1 is used earlier in the task order
+    if value_precedence:
+        order = value_precedence_order(tasks, fixed_tasks[:resources])
+        clauses, id_variable = value_precedence_clauses(order, lambda i, j: resource_literals(code[i], j, resources), resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+
+    # Symmetry breaking 4: tasks with identical (r, e, d) start in index order, equal starts use increasing resources
+    if identical_tasks:
+        groups = identical_task_groups(tasks, fixed_tasks[:resources])
+        print_to_console_and_log(f"Identical task groups: {len(groups)}")
+        starts_by, clauses, id_variable = started_by_literals(tasks, groups, lambda i, t: z[i][t], id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+        clauses, id_variable = identical_task_clauses(tasks, groups, starts_by, lambda i, j: resource_literals(code[i], j, resources), resources, id_variable)
+        for clause in clauses:
+            sat_solver.add_clause(clause)
+    
+    # Symmetry breaking 2: if each task i has t in range(r_max, d_min), then z[i][t] = True
+    for i in range(len(tasks)):
+        for t in range(tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([z[i][t]])
+            # print(f"Added clause S2: z{i+1}{t}")
+
+    # D3: A resource can only be held by one task at a time
+    for (i, ip), start, end in zip(pairs.tolist(), lo.tolist(), hi.tolist()):
+        common = range(start, end)
+        if resource_encoding == "direct":
+            for j in range(resources):
+                for t in common:
+                    sat_solver.add_clause([-z[i][t], -code[i][j], -z[ip][t], -code[ip][j]])
+                    # print(f"Added clause D3: -z{i+1}{t} -u{i+1}{j+1} -z{ip+1}{t} -u{ip+1}{j+1}")
+        else:
+            # eq holds whenever both codes are equal, so D3 is -z[i][t] v -z[ip][t] v -eq
+            eq = new_var()
+            codes_differ(code[i], code[ip], eq)
+            for t in common:
+                sat_solver.add_clause([-z[i][t], -z[ip][t], -eq])
+                # print(f"Added clause D3: -z{i+1}{t} -z{ip+1}{t} -eq{i+1}{ip+1}")
+    
+    for i in range(len(tasks)):
+        clause = []
+        clause_str = []
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1] + 1):
+            clause.append(z[i][t])
+            clause_str.append(f"z{i+1}{t}")
+        sat_solver.add_clause(clause)
+        # print(f"Added clause C3: {clause_str}")
+
+    # check each pair z_i^t and z_i^t+1, if u_ij ^ -z_i^t ^ z_i^t+1 -> ^ z_list[j]
+    for i in range(len(tasks)):
+        for t in range(tasks[i][0] + 1, tasks[i][0] + tasks[i][1]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], z[i][t]])
+            # print(f"Added clause C41: -z{i+1}{tasks[i][0]} z{i+1}{t}")
+
+        for t in range (tasks[i][0] + tasks[i][1], tasks[i][2]):
+            sat_solver.add_clause([-z[i][tasks[i][0]], -z[i][t]])
+            # print(f"Added clause C42: -z{i+1}{tasks[i][0]} -z{i+1}{t}")
+
+        for t in range(tasks[i][0], tasks[i][2] - tasks[i][1]):
+            for tpp in range(t+1, t + tasks[i][1] + 1):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], z[i][tpp]])
+                    # print(f"Added clause C51: z{i+1}{t}, -z{i+1}{t+1}, z{i+1}{tpp}")
+
+            for tpp in range(t + tasks[i][1] + 1, tasks[i][2]):
+                if tpp < max_time:
+                    sat_solver.add_clause([z[i][t], -z[i][t+1], -z[i][tpp]])
+                    # print(f"Added clause C52: z{i+1}{t}, -z{i+1}{t+1}, -z{i+1}{tpp}")
+
+    # sat_solver.add_clause([z[1][3]])
+    return code, z
+
+def solve_with_timeout(tasks, resources, result_container, finished_event):
+    global sat_solver
+    sat_solver = Glucose3()
+    
+    try:
+        code, z = encode_problem_es3(tasks, resources)
+        # Interruptible, so that solve_es3 can stop the search at the time budget
+        result = sat_solver.solve_limited(expect_interrupt=True)
+
+        result_container['variables'] = sat_solver.nof_vars()
+        result_container['clauses'] = sat_solver.nof_clauses()
+        
+        if result is None:
+            result_container['status'] = 'TIMEOUT'
+        elif result:
+            model = sat_solver.get_model()
+            # pysat leaves variables that occur in no clause out of the model: they are free, read them as false
+            model += [-v for v in range(len(model) + 1, id_variable + 1)]
+            result_container['status'] = 'SAT'
+            result_container['model'] = model
+            result_container['code'] = code
+            result_container['z'] = z
+        else:
+            result_container['status'] = 'UNSAT'
+            
+    except Exception as e:
+        result_container['status'] = 'ERROR'
+        result_container['error'] = str(e)
+    
+    finished_event.set()
+
+def solve_es3(tasks, resources):
+    global sat_solver
+    
+    result_container = {}
+    finished_event = Event()
+    
+    start_time = time.time()
+    solver_thread = Thread(target=solve_with_timeout, args=(tasks, resources, result_container, finished_event))
+    solver_thread.start()
+    
+    # Wait for either completion or timeout
+    finished = finished_event.wait(timeout=time_budget)
+    solve_time = time.time() - start_time
+    
+    if not finished:
+        sat_solver.interrupt()
+        solver_thread.join()  # Wait for thread to clean up
+        sat_solver.delete()
+        return "Time out", solve_time, 0, 0, None
+
+    num_variables = result_container.get('variables', 0)
+    num_clauses = result_container.get('clauses', 0)
+        
+    if result_container.get('status') == 'SAT':
+        model = result_container['model']
+        code = result_container['code']
+        z = result_container['z']
+
+        # Decode the resource index from its code, then map back to the u/z layout
+        starts = decode_starts(tasks, model, z)
+        task_resource = [next((j for j in range(resources) if all(model[abs(lit) - 1] * lit > 0 for lit in resource_literals(code[i], j, resources))), None) for i in range(len(tasks))]
+        model, u, z = schedule_to_model(tasks, starts, task_resource, resources)
+        
+        print("SAT")
+        
+        if not validate_solution(tasks, model, u, z, resources):
+            sys.exit(1)
+        
+        sat_solver.delete()
+        return "SAT", solve_time, num_variables, num_clauses, (starts, task_resource)
+    
+    elif result_container.get('status') == 'UNSAT':
+        print_to_console_and_log("UNSAT")
+        sat_solver.delete()
+        return "UNSAT", solve_time, num_variables, num_clauses, None
+    
+    else:
+        print_to_console_and_log(f"Error: {result_container.get('error')}")
+        sat_solver.delete()
+        return "ERROR", solve_time, 0, 0, None
+
+def validate_solution(tasks, model, u, z, resources):
+    task_resource = {}
+    task_times = {}
+    resource_usage = {j: [] for j in range(resources)}
+
+    for i, task in enumerate(tasks):
+        for j in range(resources):
+            if model[u[i][j] - 1] > 0:
+                task_resource[i] = j
+        
+        task_times[i] = [t for t in range(task[0], task[2]) if model[z[i][t] - 1] > 0]
+        
+        if task_resource.get(i) is not None:
+            resource_usage[task_resource[i]].extend(task_times[i])
+
+    # Check constraints
+    for i, task in enumerate(tasks):
+        # Check if task is assigned to exactly one resource
+        if i not in task_resource:
+            print_to_console_and_log(f"Error: Task {i} is not assigned to any resource")
+            return False
+
+        # Check if task starts after its release time
+        if task_times[i][0] < task[0]:
+            print_to_console_and_log(f"Error: Task {i+1} starts before its release time")
+            return False
+
+        # Check if task finishes before its deadline
+        if task_times[i][-1] >= task[2]:
+            print_to_console_and_log(f"Error: Task {i+1} finishes after its deadline")
+            return False
+
+        # Check if task execution is continuous and matches the execution time
+        if len(task_times[i]) != task[1] or any(task_times[i][j+1] - task_times[i][j] != 1 for j in range(len(task_times[i])-1)):
+            print_to_console_and_log(f"Error: Task {i+1} execution is not continuous or doesn't match execution time")
+            return False
+
+    # Check if any resource is used by multiple tasks at the same time
+    for j, times in resource_usage.items():
+        if len(times) != len(set(times)):
+            print_to_console_and_log(f"Error: Resource {j+1} is used by multiple tasks at the same time")
+            return False
+
+    print_to_console_and_log("Solution is valid!")
+    return True
+
+def check_schedule(tasks, starts, task_resource, resources):
+    # Check a schedule from any pipeline stage with validate_solution, through the es3 u/z layout
+    return validate_solution(tasks, *schedule_to_model(tasks, starts, task_resource, resources), resources)
+
+def process_input_files(input_folder, resources=200):
+    global id_counter, type
+
+    # results = {}
+    for filename in os.listdir(input_folder):
+        if filename.endswith(".txt"):
+            file_path = os.path.join(input_folder, filename)
+            with open(file_path, 'r') as f:
+                num_tasks = int(f.readline().strip())
+                tasks = ast.literal_eval(f.readline().strip())
+                print(f"tasks: {tasks}")
+
+            print_to_console_and_log(f"Processing {filename}...")
+            # Normalise, presolve, front stages and encoding, see pipeline.solve_instance
+            res, solve_time, num_variables, num_clauses, method, instance = solve_instance(tasks, num_tasks, sys.modules[__name__])
+            # res, solve_time, num_variables, num_clauses = solve_es3(tasks, resources)
+            result_dict = {
+                "ID": id_counter,
+                "Problem": os.path.basename(filename),
+                "Type": type,
+                "Time": solve_time,
+                "Result": res,
+                "Variables": num_variables,
+                "Clauses": num_clauses,
+                "Method": method,
+                "Class": instance
+            }
+            write_to_xlsx(result_dict)
+            id_counter += 1
+
+    # Suite report of the preemptive flow filter, when it ran on any instance
+    if flow_filter_stats['runs']:
+        print_to_console_and_log(f"Preemptive flow filter: {flow_filter_stats['caught']} UNSAT caught in {flow_filter_stats['runs']} runs, {flow_filter_stats['time']:.3f}s")
+    # Suite report of the special-case engines per instance class
+    for instance, stats in engine_stats.items():
+        print_to_console_and_log(f"{instance.capitalize()} engine: {stats['decided']} of {stats['runs']} instances decided, {stats['time']:.3f}s")
+
+    # return results
+
+# Main execution
+input_folder = "input/" + sys.argv[1]
+# input_folder = "input/huge"
+process_input_files(input_folder)
+
+log_file.close()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import heapq
+import random
+
+from interval_index import IntervalIndex
+from resource_decoder import schedule_error
+
+# Heuristic fast path in front of the encoders. Unlike the EDF list scheduling of
+# the bounding stage, which only ever starts tasks at the current time, insertion
+# scheduling places every task at its earliest free start on any resource, so a
+# later task can still fill a gap left before an earlier one.
+
+def earliest_start(placed, r, e, d):
+    # Earliest s in [r, d - e] with [s, s + e) free in the interval index of one resource, or None
+    s = r
+    while s + e <= d:
+        clash = placed.overlapping(s, s + e)
+        if not clash:
+            return s
+        s = max(placed.interval(k)[1] for k in clash)
+    return None
+
+def insertion_schedule(tasks, resources, priority):
+    # Pop the tasks from a priority queue on priority[i] and place each one at its earliest
+    # feasible start, on the lowest resource reaching it. Returns (starts, task_resource) or None
+    queue = [(priority[i], i) for i in range(len(tasks))]
+    heapq.heapify(queue)
+    placed = [IntervalIndex() for _ in range(resources)]
+    starts = [None] * len(tasks)
+    task_resource = [None] * len(tasks)
+
+    while queue:
+        _, i = heapq.heappop(queue)
+        r, e, d = tasks[i]
+        best = None
+        for j in range(resources):
+            s = earliest_start(placed[j], r, e, d)
+            if s is not None and (best is None or s < best[0]):
+                best = (s, j)
+                if s == r:
+                    break
+        if best is None:
+            return None
+        starts[i], task_resource[i] = best
+        placed[best[1]].insert(i, best[0], best[0] + e)
+
+    return starts, task_resource
+
+def heuristic_schedule(tasks, resources, restarts=10, seed=0):
+    # Insertion scheduling in earliest-deadline order, then `restarts` runs whose priorities
+    # blend the deadline with the latest start d - e and add a random tie-break.
+    # Returns (result, method, evidence) like bound_instance: "SAT" with a checked
+    # (starts, task_resource), or (None, None, None) when every run fails
+    rng = random.Random(seed)
+    priorities = [[(d, r, i) for i, (r, e, d) in enumerate(tasks)]]
+    for _ in range(restarts):
+        w = rng.random()
+        priorities.append([(d - w * e, rng.random(), i) for i, (r, e, d) in enumerate(tasks)])
+
+    for priority in priorities:
+        schedule = insertion_schedule(tasks, resources, priority)
+        if schedule is not None and schedule_error(tasks, *schedule, resources) is None:
+            return "SAT", "insertion heuristic", schedule
+    return None, None, None
@@ -0,0 +1,127 @@
+import random
+
+# Dynamic index over task intervals for incremental queries ("which tasks can
+# overlap this window?") without rescanning the task list. Intervals are
+# half-open [lo, hi) like the windows [r, d) and the compulsory parts
+# [d - e, r + e). The index is a treap ordered by (lo, key) whose nodes also
+# keep the largest hi of their subtree: insert and delete take O(log n)
+# expected, and a query skips every subtree that ends before the queried
+# window or starts after it, so it visits O(log n) nodes per reported interval.
+
+class _Node:
+    __slots__ = ("lo", "hi", "key", "priority", "left", "right", "reach")
+
+    def __init__(self, lo, hi, key, priority):
+        self.lo, self.hi, self.key, self.priority = lo, hi, key, priority
+        self.left = self.right = None
+        self.reach = hi
+
+def _update(node):
+    # reach = largest hi in the subtree of node
+    node.reach = node.hi
+    if node.left is not None and node.left.reach > node.reach:
+        node.reach = node.left.reach
+    if node.right is not None and node.right.reach > node.reach:
+        node.reach = node.right.reach
+
+def _split(node, lo, key):
+    # Split into the nodes ordered before (lo, key) and the others
+    if node is None:
+        return None, None
+    if (node.lo, node.key) < (lo, key):
+        node.right, right = _split(node.right, lo, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, lo, key)
+    _update(node)
+    return left, node
+
+def _merge(left, right):
+    # Every node of left is ordered before every node of right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+def _split_first(node):
+    # Detach the first node in order, returns it and the remaining tree
+    if node.left is None:
+        return node, node.right
+    first, node.left = _split_first(node.left)
+    _update(node)
+    return first, node
+
+class IntervalIndex:
+    def __init__(self, intervals=(), seed=0):
+        # intervals: (key, lo, hi) triples, keys are task ids (any orderable, hashable value)
+        self.root = None
+        self.intervals = {}
+        self.random = random.Random(seed)
+        for key, lo, hi in intervals:
+            self.insert(key, lo, hi)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __contains__(self, key):
+        return key in self.intervals
+
+    def interval(self, key):
+        return self.intervals[key]
+
+    def insert(self, key, lo, hi):
+        # Add [lo, hi) under key, replacing the interval already stored for key
+        if key in self.intervals:
+            self.delete(key)
+        self.intervals[key] = (lo, hi)
+        left, right = _split(self.root, lo, key)
+        node = _Node(lo, hi, key, self.random.random())
+        self.root = _merge(_merge(left, node), right)
+
+    def delete(self, key):
+        lo, hi = self.intervals.pop(key)
+        left, right = _split(self.root, lo, key)
+        # The node of key is the first one of right
+        _, right = _split_first(right)
+        self.root = _merge(left, right)
+
+    def overlapping(self, lo, hi):
+        # Keys of the stored intervals sharing a time step with [lo, hi), in (lo, key) order
+        found = []
+
+        def visit(node):
+            # Nothing in this subtree ends after lo
+            if node is None or node.reach <= lo:
+                return
+            visit(node.left)
+            # The node and its right subtree start at or after hi
+            if node.lo >= hi:
+                return
+            if node.hi > lo:
+                found.append(node.key)
+            visit(node.right)
+
+        visit(self.root)
+        return found
+
+    def stab(self, t):
+        # Keys of the stored intervals containing time step t
+        return self.overlapping(t, t + 1)
+
+def window_index(tasks, ids=None):
+    # Index over the windows [r, d) of the given task ids (all tasks by default)
+    ids = range(len(tasks)) if ids is None else ids
+    return IntervalIndex((i, tasks[i][0], tasks[i][2]) for i in ids)
+
+def compulsory_index(tasks, ids=None):
+    # Index over the compulsory parts [d - e, r + e), tasks without one are left out
+    ids = range(len(tasks)) if ids is None else ids
+    return IntervalIndex((i, tasks[i][2] - tasks[i][1], tasks[i][0] + tasks[i][1]) for i in ids
+                         if tasks[i][2] - tasks[i][1] < tasks[i][0] + tasks[i][1])
@@ -0,0 +1,98 @@
+import random
+import time
+
+import numpy as np
+
+from bounds import bound_instance
+from interval_index import IntervalIndex
+from localsearch import move_costs
+from resource_decoder import assign_resources, schedule_error
+
+# Large-neighbourhood search for instances too large to encode as a whole. A greedy
+# pass places every task it can at its earliest start with a free resource and
+# leaves the others unscheduled. Each iteration then picks an unscheduled task,
+# frees the scheduled tasks lying inside a time window around it and re-solves
+# them together with it, by the bounds or else the SAT encoder. Tasks crossing
+# the window border stay frozen and enter the subproblem clipped to the window
+# as fixed tasks, so the subproblem sees exactly the capacity left to the freed
+# tasks. Resources are identical, so only start times are kept and resources
+# are assigned by the greedy colouring at the end.
+
+def window_around(task, running, horizon, size):
+    # Grow [r, d) of the task on both sides until about `size` scheduled tasks lie inside
+    r, e, d = task
+    a, b = r, d
+    step = max(1, (d - r) // 2)
+    while True:
+        inside = [k for k in running.overlapping(a, b) if a <= running.interval(k)[0] and running.interval(k)[1] <= b]
+        if len(inside) >= size or (a == 0 and b == horizon):
+            return a, b, inside
+        a, b = max(0, a - step), min(horizon, b + step)
+        step *= 2
+
+def lns_schedule(tasks, resources, solve_subproblem, time_limit, iteration_budget, neighbourhood_size=30, seed=0):
+    # solve_subproblem(tasks, resources, budget) returns (result, starts, ...) like solve_component.
+    # Returns (result, method, evidence) like bound_instance, "SAT" with a checked
+    # (starts, task_resource) or None, followed by the convergence history: one
+    # (iteration, elapsed seconds, unscheduled tasks, freed tasks, result) entry per iteration
+    start_time = time.time()
+    rng = random.Random(seed)
+    n = len(tasks)
+    horizon = max(task[2] for task in tasks)
+
+    # Greedy start: earliest start with a free resource, in earliest-deadline order
+    load = np.zeros(horizon, dtype=np.int32)
+    starts = [None] * n
+    running = IntervalIndex()
+    for i in sorted(range(n), key=lambda i: (tasks[i][2], tasks[i][0])):
+        r, e, d = tasks[i]
+        fits = np.flatnonzero(move_costs(load, r, e, d, resources) == 0)
+        if len(fits):
+            starts[i] = r + int(fits[0])
+            load[starts[i]:starts[i] + e] += 1
+            running.insert(i, starts[i], starts[i] + e)
+
+    unscheduled = [i for i in range(n) if starts[i] is None]
+    # Neighbourhood size per task, doubled whenever the subproblem of that task is UNSAT
+    size = {i: neighbourhood_size for i in unscheduled}
+    history = [(0, time.time() - start_time, len(unscheduled), 0, None)]
+    iteration = 0
+
+    while unscheduled and time.time() - start_time < time_limit:
+        iteration += 1
+        u = rng.choice(unscheduled)
+        a, b, inside = window_around(tasks[u], running, horizon, size[u])
+
+        # Subproblem in window time t - a: the freed tasks keep their windows clipped to [a, b),
+        # the frozen tasks running in [a, b) are fixed to their clipped runs
+        freed = inside + [u]
+        sub_tasks = [(max(tasks[i][0], a) - a, tasks[i][1], min(tasks[i][2], b) - a) for i in freed]
+        for k in running.overlapping(a, b):
+            s, f = running.interval(k)
+            if s < a or b < f:
+                sub_tasks.append((max(s, a) - a, min(f, b) - max(s, a), min(f, b) - a))
+
+        # The bounds decide many subproblems without encoding them
+        result, _, evidence = bound_instance(sub_tasks, resources, record_stats=False)
+        if result is None:
+            result, sub_starts = solve_subproblem(sub_tasks, resources, iteration_budget)[:2]
+        elif result == "SAT":
+            sub_starts = evidence[0]
+        if result == "SAT":
+            for k, i in enumerate(freed):
+                if starts[i] is not None:
+                    load[starts[i]:starts[i] + tasks[i][1]] -= 1
+                starts[i] = sub_starts[k] + a
+                load[starts[i]:starts[i] + tasks[i][1]] += 1
+                running.insert(i, starts[i], starts[i] + tasks[i][1])
+            unscheduled.remove(u)
+        elif result == "UNSAT":
+            size[u] *= 2
+        history.append((iteration, time.time() - start_time, len(unscheduled), len(freed), result))
+
+    if unscheduled:
+        return None, None, None, history
+    schedule = (starts, assign_resources(tasks, starts, resources))
+    if schedule[1] is None or schedule_error(tasks, *schedule, resources) is not None:
+        return None, None, None, history
+    return "SAT", "large-neighbourhood search", schedule, history
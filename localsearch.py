@@ -0,0 +1,100 @@
+import random
+import time
+
+import numpy as np
+
+from interval_index import IntervalIndex
+from resource_decoder import assign_resources, schedule_error
+
+# Incomplete local search for instances too large to encode. Every task keeps a
+# start time, and tasks may overload the resources while searching: load[t]
+# counts the tasks running at time t and the cost is the surplus
+# sum max(load - resources, 0). Resources are identical, so once the cost is 0
+# the greedy colouring of resource_decoder assigns them without conflicts.
+# A move takes one task running at an overloaded time step and restarts it at
+# the start in [r, d - e] that meets the fewest full time steps. Moving a task
+# back to a start it just left is tabu for a few iterations, and the search
+# restarts from a new greedy construction when it stalls.
+
+def move_costs(load, r, e, d, resources):
+    # costs[k] = full time steps (load >= resources) in [r + k, r + k + e), for every start r + k <= d - e
+    full = np.concatenate([[0], np.cumsum(load[r:d] >= resources)])
+    return full[e:] - full[:-e]
+
+def local_search_schedule(tasks, resources, time_limit, tabu_tenure=10, restart_after=20000, seed=0):
+    # Min-conflicts search with tabu and restarts. Returns (result, method, evidence) like
+    # bound_instance: "SAT" with a checked (starts, task_resource) once no time step is
+    # overloaded, or (None, None, None) when time_limit seconds pass first
+    start_time = time.time()
+    rng = random.Random(seed)
+    n = len(tasks)
+    horizon = max(task[2] for task in tasks)
+
+    def construct(priority):
+        # Greedy start: place the tasks in priority order at their cheapest start, earliest first
+        load = np.zeros(horizon, dtype=np.int32)
+        starts = [0] * n
+        running = IntervalIndex()
+        for i in sorted(range(n), key=lambda i: priority[i]):
+            r, e, d = tasks[i]
+            starts[i] = r + int(np.argmin(move_costs(load, r, e, d, resources)))
+            load[starts[i]:starts[i] + e] += 1
+            running.insert(i, starts[i], starts[i] + e)
+        return load, starts, running
+
+    load, starts, running = construct([(d, r) for r, e, d in tasks])
+    cost = int(np.maximum(load - resources, 0).sum())
+    best_cost = cost
+    tabu = {}  # task -> [(start, last tabu iteration)]
+    iteration, stalled = 0, 0
+
+    while cost > 0:
+        if time.time() - start_time > time_limit:
+            return None, None, None
+        iteration += 1
+
+        # A task running at an overloaded time step
+        t = int(rng.choice(np.flatnonzero(load > resources)))
+        i = rng.choice(running.stab(t))
+        r, e, d = tasks[i]
+        s = starts[i]
+
+        # Take task i out, it was surplus at the steps that stay full without it
+        load[s:s + e] -= 1
+        removed = int((load[s:s + e] >= resources).sum())
+
+        costs = move_costs(load, r, e, d, resources).astype(float)
+        tabu[i] = [entry for entry in tabu.get(i, []) if entry[1] >= iteration]
+        for ts, _ in tabu[i]:
+            # Aspiration: a tabu move is allowed when it beats the best cost so far
+            if cost - removed + costs[ts - r] >= best_cost:
+                costs[ts - r] = np.inf
+        if np.isinf(costs).all():
+            costs = move_costs(load, r, e, d, resources).astype(float)
+
+        # Cheapest start, ties broken at random
+        choices = np.flatnonzero(costs == costs.min())
+        k = int(choices[rng.randrange(len(choices))])
+        added = int(costs[k])
+
+        starts[i] = r + k
+        load[starts[i]:starts[i] + e] += 1
+        running.insert(i, starts[i], starts[i] + e)
+        tabu[i].append((s, iteration + tabu_tenure))
+        cost += added - removed
+
+        if cost < best_cost:
+            best_cost, stalled = cost, 0
+        else:
+            stalled += 1
+        if stalled > restart_after:
+            # Restart from a construction on perturbed deadlines
+            w = rng.random()
+            load, starts, running = construct([(d - w * e, rng.random()) for r, e, d in tasks])
+            cost = int(np.maximum(load - resources, 0).sum())
+            best_cost, tabu, stalled = cost, {}, 0
+
+    schedule = (starts, assign_resources(tasks, starts, resources))
+    if schedule[1] is None or schedule_error(tasks, *schedule, resources) is not None:
+        return None, None, None
+    return "SAT", "local search", schedule
@@ -0,0 +1,143 @@
+import sys
+import time
+
+from bounds import window_clique, energy_certificate, refute_instance, schedule_bound
+from decompose import split_components, solve_components
+from engines import special_case, instance_class
+from heuristics import heuristic_schedule
+from lns import lns_schedule
+from localsearch import local_search_schedule
+from presolve import tighten_windows, normalise_tasks, restore_schedule
+from resource_decoder import schedule_error
+from rolling import rolling_horizon_schedule
+
+# Per-instance pipeline shared by the es3 drivers. The presolve reshapes the
+# instance, the front stages try to decide it without an encoding, and the
+# driver's own encoder runs only when none of them does. Schedules and UNSAT
+# certificates are mapped back to the input task ids and times for the report.
+
+def restore_certificate(certificate, tasks, input_tasks, resources, mapping):
+    # Energy certificate in input times, as (a, b, energy, windows). The certificate found on the
+    # presolved windows may not hold on the input windows, so the input windows are checked
+    # first: when they give a certificate of their own, it is returned with no windows. Otherwise
+    # windows lists (input id, r, d) for the presolved windows the energy relies on, the narrowed
+    # windows of tasks with a positive minimum energy in [a, b)
+    ids, scale, shift = mapping['ids'], mapping['scale'], mapping['shift']
+    input_certificate = energy_certificate([input_tasks[i] for i in ids], resources)
+    if input_certificate is not None:
+        return (*input_certificate, [])
+
+    a, b, energy = certificate
+    windows = []
+    for k, (r, e, d) in enumerate(tasks):
+        narrowed = (scale * r + shift, scale * d + shift) != (input_tasks[ids[k]][0], input_tasks[ids[k]][2])
+        if narrowed and min(e, b - a, r + e - a, b - d + e) > 0:
+            windows.append((ids[k], scale * r + shift, scale * d + shift))
+    return scale * a + shift, scale * b + shift, scale * energy, windows
+
+def solve_instance(tasks, resources, driver):
+    # Run one instance through the pipeline: normalise, cap the resources, tighten the
+    # windows, run the front stages switched on by the driver flags and encode only when none of
+    # them decides the instance. driver is the calling es3 module: its flags select the stages,
+    # driver.solve_es3(tasks, resources) returns (result, time, variables, clauses, schedule) and
+    # driver.print_to_console_and_log writes the log. Drivers with a module-level
+    # solve_component(tasks, resources, budget) also get decomposition, LNS and the rolling horizon.
+    # Every stage names itself in the method it returns. A SAT schedule is reported and checked
+    # in input task ids and times, by driver.check_schedule(tasks, starts, task_resource, resources)
+    # when the driver has one and by schedule_error otherwise.
+    # Returns (result, time, variables, clauses, method, class)
+    log = driver.print_to_console_and_log
+    solve_component = getattr(driver, 'solve_component', None)
+    check_schedule = getattr(driver, 'check_schedule', None)
+    time_budget = driver.time_budget
+
+    # One timer from normalisation to the decision, so the Time column compares across methods
+    start_time = time.time()
+    # Normalisation: drop tasks longer than their window, shift time to min r = 0, divide by the common GCD, sort by (r, d, e)
+    input_tasks = tasks
+    tasks, mapping = normalise_tasks(tasks, canonical=driver.normalisation)
+    if mapping['shift'] or mapping['scale'] > 1:
+        log(f"Normalised: input time = {mapping['scale']} * time + {mapping['shift']}")
+    if mapping['ids'] != sorted(mapping['ids']):
+        log(f"Task order: {[i + 1 for i in mapping['ids']]}")
+    # No schedule needs more resources than the most task windows [r, d) overlapping at one time point
+    effective_resources = min(resources, window_clique(tasks)) if driver.cap_resources else resources
+    log(f"Resources: requested {resources}, effective {effective_resources}")
+    # Presolve: tighten the windows [r, d) against the resource capacity, None proves the instance UNSAT
+    tightened = tighten_windows(tasks, effective_resources) if driver.window_tightening and not mapping['infeasible'] else tasks
+    if mapping['infeasible']:
+        res, method, evidence = "UNSAT", "normalisation check", None
+        log(f"Tasks {[i + 1 for i in mapping['infeasible']]} are longer than their windows")
+    elif tightened is None:
+        res, method, evidence = "UNSAT", "window-tightening presolve", None
+    else:
+        log(f"Presolve removed {sum(d - r for r, e, d in tasks) - sum(d - r for r, e, d in tightened)} window time steps")
+        tasks = tightened
+        # Infeasibility checks: compulsory overlap, energy and preemptive flow only ever prove UNSAT
+        res, method, evidence = refute_instance(tasks, effective_resources) if driver.infeasibility_checks else (None, None, None)
+        # Bounding stage: decide SAT instances from the window-clique and EDF bounds before building any encoding
+        if res is None and driver.bounding:
+            res, method, evidence = schedule_bound(tasks, effective_resources)
+        # Special-case engines: unit-time and single-resource instances are decided without SAT
+        if res is None and driver.special_engines:
+            res, method, evidence = special_case(tasks, effective_resources, min(driver.engine_budget, time_budget))
+        # Heuristic fast path: a schedule found by insertion scheduling proves SAT without encoding
+        if res is None and driver.heuristic:
+            res, method, evidence = heuristic_schedule(tasks, effective_resources)
+        very_large = len(tasks) >= getattr(driver, 'local_search_tasks', 1000)
+        # Local search: very large instances get an incomplete min-conflicts search before encoding
+        if res is None and getattr(driver, 'local_search', False) and very_large:
+            res, method, evidence = local_search_schedule(tasks, effective_resources, min(driver.local_search_budget, time_budget))
+        # Large-neighbourhood search: re-solve small task subsets around the tasks the greedy could not place
+        if res is None and getattr(driver, 'lns', False) and solve_component and very_large:
+            res, method, evidence, history = lns_schedule(tasks, effective_resources, solve_component, min(driver.lns_budget, time_budget), driver.lns_iteration_budget)
+            log(f"LNS: {history[-1][0]} iterations, {sum(entry[4] == 'SAT' for entry in history)} repaired, "
+                f"unscheduled {history[0][2]} -> {history[-1][2]} in {history[-1][1]:.3f}s")
+        # Rolling horizon: long horizons are solved window by window, a failed window falls back to the full solve
+        if res is None and getattr(driver, 'rolling_horizon', False) and solve_component and tasks and max(task[2] for task in tasks) >= driver.rolling_min_horizon:
+            res, method, evidence, history = rolling_horizon_schedule(tasks, effective_resources, solve_component, driver.rolling_window, driver.rolling_overlap, driver.rolling_step_budget)
+            if res is None:
+                log(f"Rolling horizon: window at {history[-1][0]} is {history[-1][3]}, falling back to the full solve")
+            else:
+                log(f"Rolling horizon: {len(history)} windows, at most {max(entry[1] for entry in history)} tasks per window")
+    if res is not None:
+        solve_time = time.time() - start_time
+        num_variables, num_clauses = 0, 0
+        log(f"{res} by the {method}")
+        if res == "UNSAT" and evidence is not None:
+            # Certificate in input times, checked against the input windows or listing the presolved windows it needs
+            a, b, energy, windows = restore_certificate(evidence, tasks, input_tasks, effective_resources, mapping)
+            log(f"Certificate: the tasks need at least {energy} resource steps in [{a}, {b}), more than {effective_resources} * {b - a}")
+            for i, r, d in windows:
+                log(f"Certificate: given the presolved window [{r}, {d}) of task {i+1}")
+    else:
+        # Decomposition stage: independent components of the window-overlap graph are solved in parallel within one time budget
+        decompose = getattr(driver, 'decomposition', False) and solve_component
+        components = split_components(tasks) if decompose else [list(range(len(tasks)))]
+        if len(components) > 1:
+            method = f"decomposition ({len(components)} components)"
+            log(f"Decomposed into {len(components)} components")
+            res, starts, task_resource, num_variables, num_clauses = solve_components(tasks, effective_resources, components, solve_component, time_budget)
+            evidence = (starts, task_resource)
+            log(res)
+        else:
+            method = "search"
+            res, _, num_variables, num_clauses, evidence = driver.solve_es3(tasks, effective_resources)
+        solve_time = time.time() - start_time
+    if res == "SAT":
+        # Report and check the schedule in input task ids and times, whichever stage found it
+        starts, task_resource = restore_schedule(*evidence, mapping, len(input_tasks))
+        for i, (start, j) in enumerate(zip(starts, task_resource)):
+            log(f"Task {i+1} starts at {start} on resource {j+1}")
+        # Drivers with the es3 u/z model check it with their own validate_solution, see check_schedule,
+        # the drivers whose models have another layout with schedule_error
+        if check_schedule is not None:
+            if not check_schedule(input_tasks, starts, task_resource, effective_resources):
+                sys.exit(1)
+        else:
+            error = schedule_error(input_tasks, starts, task_resource, effective_resources)
+            if error is not None:
+                log(f"Error: {error}")
+                sys.exit(1)
+
+    return res, solve_time, num_variables, num_clauses, method, instance_class(tasks, effective_resources)
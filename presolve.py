@@ -0,0 +1,165 @@
+from math import gcd
+
+import numpy as np
+
+# Time-window tightening presolve. Each task i must run e_i consecutive steps
+# inside [r_i, d_i) on one of `resources` identical resources, which is a
+# cumulative constraint with unit demands. The rules below only remove start
+# times that no schedule can use, so the tightened windows keep every solution
+# and feed any of the encoders unchanged.
+
+def timetable(est, lct, e, resources):
+    # Time-tabling: the compulsory part [lct - e, est + e) of a task runs in every schedule.
+    # A task cannot run where the compulsory parts of the others already use all resources
+    horizon = int(lct.max())
+    profile = np.zeros(horizon + 1, dtype=int)
+    for k in range(len(e)):
+        if lct[k] - e[k] < est[k] + e[k]:
+            profile[lct[k] - e[k]:est[k] + e[k]] += 1
+
+    new_est, new_lct = est.copy(), lct.copy()
+    for i in range(len(e)):
+        own = np.zeros(horizon + 1, dtype=int)
+        if lct[i] - e[i] < est[i] + e[i]:
+            own[lct[i] - e[i]:est[i] + e[i]] = 1
+        full = profile - own >= resources
+
+        # Earliest start s >= est with no full time step in [s, s + e)
+        s = est[i]
+        while s + e[i] <= lct[i]:
+            blocked = np.flatnonzero(full[s:s + e[i]])
+            if len(blocked) == 0:
+                break
+            s += blocked[-1] + 1
+        new_est[i] = s
+
+        # Latest end f <= lct with no full time step in [f - e, f)
+        f = lct[i]
+        while f - e[i] >= new_est[i]:
+            blocked = np.flatnonzero(full[f - e[i]:f])
+            if len(blocked) == 0:
+                break
+            f -= e[i] - blocked[0]
+        new_lct[i] = f
+
+    return new_est, new_lct
+
+def edge_finding(est, lct, e, resources):
+    # Edge-finding over the task intervals Omega = {k : est_k >= L, lct_k <= U}.
+    # If Omega and i do not fit between min(L, est_i) and U, task i ends after all of Omega,
+    # and it starts once the part of Omega that cannot run beside it is done:
+    # est_i >= L + e(Omega) - (resources - 1) * (U - L)
+    L = np.unique(est)
+    U = np.unique(lct)
+    inside_L = est[:, None] >= L[None, :]
+    inside_U = lct[:, None] <= U[None, :]
+    energy = (e[:, None] * inside_L).T @ inside_U
+    width = U[None, :] - L[:, None]
+    rest = energy - (resources - 1) * width
+
+    new_est = est.copy()
+    for i in range(len(e)):
+        outside = ~(inside_L[i][:, None] & inside_U[i][None, :])
+        start = np.minimum(L, est[i])[:, None]
+        detected = outside & (energy > 0) & (width > 0) & (energy + e[i] > resources * (U[None, :] - start)) & (rest > 0)
+        if detected.any():
+            new_est[i] = max(est[i], int((L[:, None] + rest)[detected].max()))
+    return new_est
+
+def not_first(est, lct, e, resources):
+    # Not-first over the same task intervals: if i starts before any task of Omega can end,
+    # all of Omega and the part of i in [L, U) must fit in [L, U). When they cannot,
+    # i starts no earlier than the earliest end time of Omega
+    L = np.unique(est)
+    U = np.unique(lct)
+    inside_L = est[:, None] >= L[None, :]
+    inside_U = lct[:, None] <= U[None, :]
+    energy = (e[:, None] * inside_L).T @ inside_U
+    width = U[None, :] - L[:, None]
+
+    # Earliest end time of each task interval, adding the tasks by decreasing est:
+    # row l holds the tasks with est >= L[l], column u those with lct <= U[u]
+    ect = np.empty((len(L), len(U)), dtype=int)
+    current = np.full(len(U), np.iinfo(int).max)
+    order = np.argsort(-est, kind='stable')
+    k = 0
+    for l in range(len(L) - 1, -1, -1):
+        while k < len(order) and est[order[k]] >= L[l]:
+            i = order[k]
+            current[U >= lct[i]] = np.minimum(current[U >= lct[i]], est[i] + e[i])
+            k += 1
+        ect[l] = current
+
+    new_est = est.copy()
+    for i in range(len(e)):
+        outside = ~(inside_L[i][:, None] & inside_U[i][None, :])
+        overlap = np.minimum(est[i] + e[i], U)[None, :] - L[:, None]
+        detected = outside & (energy > 0) & (width > 0) & (L[:, None] <= est[i]) & (est[i] < ect) & (energy + overlap > resources * width)
+        if detected.any():
+            new_est[i] = max(est[i], int(ect[detected].min()))
+    return new_est
+
+def tighten_windows(tasks, resources, max_interval_tasks=300):
+    # Propagate time-tabling, edge-finding and not-first/not-last (the last two on the
+    # mirrored instance as well) to a fixed point. Edge-finding and not-first take O(n^3)
+    # over the task intervals, so above max_interval_tasks tasks only time-tabling runs.
+    # Returns the tasks with tightened windows, or None when some window becomes too short,
+    # which proves the instance UNSAT
+    if not tasks:
+        return tasks
+    est = np.array([task[0] for task in tasks])
+    e = np.array([task[1] for task in tasks])
+    lct = np.array([task[2] for task in tasks])
+    horizon = int(lct.max())
+
+    while True:
+        if (est + e > lct).any():
+            return None
+        new_est, new_lct = timetable(est, lct, e, resources)
+        if (new_est + e > new_lct).any():
+            return None
+
+        # Not-last and the lct side of edge-finding are the est rules on the mirrored instance t -> horizon - t
+        if len(tasks) <= max_interval_tasks:
+            new_est = np.maximum(new_est, edge_finding(new_est, new_lct, e, resources))
+            new_est = np.maximum(new_est, not_first(new_est, new_lct, e, resources))
+            mirrored = np.maximum(edge_finding(horizon - new_lct, horizon - new_est, e, resources),
+                                  not_first(horizon - new_lct, horizon - new_est, e, resources))
+            new_lct = np.minimum(new_lct, horizon - mirrored)
+
+        if (new_est == est).all() and (new_lct == lct).all():
+            break
+        est, lct = new_est, new_lct
+
+    return [(int(est[i]), int(e[i]), int(lct[i])) for i in range(len(tasks))]
+
+def normalise_tasks(tasks, canonical=True):
+    # Normalisation: tasks with e > d - r can never run and are dropped (the instance is UNSAT).
+    # With canonical, time is shifted so that min r = 0, r, e and d are divided by their common
+    # GCD (left-justifying any schedule keeps every start on that grid) and tasks are sorted by
+    # (r, d, e). Returns the new tasks and the mapping back: ids[k] is the input index of task k,
+    # and input time = scale * time + shift
+    infeasible = [i for i, (r, e, d) in enumerate(tasks) if e > d - r]
+    ids = [i for i in range(len(tasks)) if i not in set(infeasible)]
+    shift, scale = 0, 1
+
+    if canonical and ids:
+        shift = min(tasks[i][0] for i in ids)
+        scale = 0
+        for i in ids:
+            r, e, d = tasks[i]
+            scale = gcd(scale, gcd(r - shift, gcd(e, d - shift)))
+        ids.sort(key=lambda i: (tasks[i][0], tasks[i][2], tasks[i][1], i))
+
+    normalised = [((tasks[i][0] - shift) // scale, tasks[i][1] // scale, (tasks[i][2] - shift) // scale) for i in ids]
+    mapping = {'ids': ids, 'shift': shift, 'scale': scale, 'infeasible': infeasible}
+    return normalised, mapping
+
+def restore_schedule(starts, task_resource, mapping, num_tasks):
+    # Map a schedule of the normalised tasks back to input task ids and input times
+    input_starts = [None] * num_tasks
+    input_resource = [None] * num_tasks
+    for k, i in enumerate(mapping['ids']):
+        input_starts[i] = mapping['scale'] * starts[k] + mapping['shift']
+        input_resource[i] = task_resource[k]
+    return input_starts, input_resource
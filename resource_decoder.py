@@ -0,0 +1,80 @@
+import heapq
+
+from interval_index import IntervalIndex
+
+# Post-hoc resource assignment for backends that only decide start times
+# (cumulative SAT, CP-SAT AddCumulative, aggregated MIP, heuristics).
+# Resources are identical, so any start vector whose peak overlap is at most
+# `resources` can be coloured with a greedy sweep over the start times.
+
+def decode_starts(tasks, model, z):
+    # Start time of task i is its first time step t with z[i][t] true in the SAT model
+    starts = []
+    for i, task in enumerate(tasks):
+        start = None
+        for t in range(task[0], task[2]):
+            if model[z[i][t] - 1] > 0:
+                start = t
+                break
+        starts.append(start)
+    return starts
+
+def assign_resources(tasks, starts, resources):
+    # Greedy interval colouring in O(n log n):
+    # busy holds (end time, resource) of running tasks, free holds idle resource ids
+    task_resource = [None] * len(tasks)
+    busy = []
+    free = list(range(resources))
+    heapq.heapify(free)
+
+    for i in sorted(range(len(tasks)), key=lambda i: starts[i]):
+        # Release every resource whose task has finished by this start time
+        while busy and busy[0][0] <= starts[i]:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        if not free:
+            # More than `resources` tasks run at starts[i]
+            return None
+        j = heapq.heappop(free)
+        task_resource[i] = j
+        heapq.heappush(busy, (starts[i] + tasks[i][1], j))
+
+    return task_resource
+
+def schedule_to_model(tasks, starts, task_resource, resources):
+    # Build a (model, u, z) triple with the es3 variable layout, so that the
+    # unchanged validate_solution(tasks, model, u, z, resources) can check the schedule
+    max_time = max(task[2] for task in tasks)
+    u = [[i * resources + j + 1 for j in range(resources)] for i in range(len(tasks))]
+    z = [[len(tasks) * resources + i * max_time + t + 1 for t in range(tasks[i][2])] for i in range(len(tasks))]
+
+    model = [-(v + 1) for v in range(len(tasks) * resources + len(tasks) * max_time)]
+    for i, task in enumerate(tasks):
+        if task_resource[i] is not None:
+            model[u[i][task_resource[i]] - 1] *= -1
+        for t in range(starts[i], min(starts[i] + task[1], task[2])):
+            model[z[i][t] - 1] *= -1
+
+    return model, u, z
+
+def schedule_error(tasks, starts, task_resource, resources):
+    # Check a (starts, task_resource) schedule directly, for schedules that never went
+    # through a solver model. Returns None when valid, otherwise the error message
+    for i, (r, e, d) in enumerate(tasks):
+        if starts[i] is None or starts[i] < r:
+            return f"Task {i+1} starts before its release time"
+        if starts[i] + e > d:
+            return f"Task {i+1} finishes after its deadline"
+        if task_resource[i] is None or not 0 <= task_resource[i] < resources:
+            return f"Task {i+1} is not assigned to any resource"
+
+    # Place the tasks one by one into an interval index per resource, a placed task must not
+    # overlap any task already on its resource
+    placed = {j: IntervalIndex() for j in range(resources)}
+    for i, (r, e, d) in enumerate(tasks):
+        j = task_resource[i]
+        clash = placed[j].overlapping(starts[i], starts[i] + e)
+        if clash:
+            return f"Resource {j+1} is used by multiple tasks at the same time (tasks {clash[0]+1} and {i+1})"
+        placed[j].insert(i, starts[i], starts[i] + e)
+
+    return None
@@ -0,0 +1,88 @@
+import numpy as np
+
+from bounds import bound_instance
+from interval_index import IntervalIndex
+from localsearch import move_costs
+from resource_decoder import assign_resources, schedule_error
+
+# Rolling-horizon decomposition for long horizons. A step solves the open tasks
+# whose windows start before t0 + window, with every start kept in
+# [t0, t0 + 2 * window): the second window is a lookahead for tasks released
+# late in the step, so the step formula spans at most two windows plus the
+# longest task whatever the total horizon. The step schedule is left-justified,
+# tasks starting before t0 + window - overlap are committed and the others are
+# carried forward and solved again in the next step, which starts at
+# t0 + window - overlap. Committed tasks still running after t0 enter the next
+# steps clipped as fixed tasks. A step forces its tasks to start before the end
+# of the lookahead, which a feasible instance may not allow, so an UNSAT or
+# timed-out step gives up and the caller falls back to the full solve.
+
+def left_shift(tasks, starts, resources):
+    # Move every task, in start order, to its earliest start with a free resource. A task only
+    # moves into time before its old start, where no task placed after it runs, so the schedule
+    # stays feasible, and committed tasks leave as much room as possible to the next windows
+    load = np.zeros(max(task[2] for task in tasks), dtype=np.int32)
+    shifted = [None] * len(tasks)
+    for i in sorted(range(len(tasks)), key=lambda i: starts[i]):
+        r, e, d = tasks[i]
+        shifted[i] = r + int(np.flatnonzero(move_costs(load, r, e, starts[i] + e, resources) == 0)[0])
+        load[shifted[i]:shifted[i] + e] += 1
+    return shifted
+
+def rolling_horizon_schedule(tasks, resources, solve_subproblem, window, overlap, step_budget):
+    # solve_subproblem(tasks, resources, budget) returns (result, starts, ...) like solve_component.
+    # Returns (result, method, evidence) like bound_instance, "SAT" with a checked
+    # (starts, task_resource) or None, followed by one (t0, step tasks, committed tasks, result)
+    # entry per step
+    if not 0 <= overlap < window:
+        raise ValueError(f"Rolling-horizon overlap {overlap} must lie in [0, window {window})")
+    n = len(tasks)
+    starts = [None] * n
+    committed = IntervalIndex()
+    open_tasks = sorted(range(n), key=lambda i: tasks[i][0])
+    history = []
+    t0 = min(task[0] for task in tasks)
+
+    while open_tasks:
+        end = t0 + window
+        step = [i for i in open_tasks if tasks[i][0] < end]
+        final = len(step) == len(open_tasks)
+
+        # Step in time t - t0: starts in [t0, end + window), so deadlines past end + window - 1 + e can be clipped
+        sub_tasks = [(max(tasks[i][0], t0) - t0, tasks[i][1], min(tasks[i][2], end + window - 1 + tasks[i][1]) - t0) for i in step]
+        horizon = max(task[2] for task in sub_tasks)
+        for k in committed.overlapping(t0, t0 + horizon):
+            s, f = committed.interval(k)
+            sub_tasks.append((0, min(f, t0 + horizon) - t0, min(f, t0 + horizon) - t0))
+
+        result, _, evidence = bound_instance(sub_tasks, resources, record_stats=False)
+        if result is None:
+            result, sub_starts = solve_subproblem(sub_tasks, resources, step_budget)[:2]
+        elif result == "SAT":
+            sub_starts = evidence[0]
+        if result != "SAT":
+            history.append((t0, len(step), 0, result))
+            return None, None, None, history
+        sub_starts = left_shift(sub_tasks, sub_starts, resources)
+
+        # Commit the tasks starting before the overlap, all of them in the last step
+        carried = []
+        for k, i in enumerate(step):
+            if final or sub_starts[k] + t0 < end - overlap:
+                starts[i] = sub_starts[k] + t0
+                committed.insert(i, starts[i], starts[i] + tasks[i][1])
+            else:
+                carried.append(i)
+        history.append((t0, len(step), len(step) - len(carried), result))
+
+        open_tasks = [i for i in open_tasks if starts[i] is None]
+        # The next step starts at least one time step later, so carried tasks cannot stall the loop
+        t0 = max(end - overlap, t0 + 1)
+        if open_tasks and not carried:
+            # Skip the time with no open task
+            t0 = max(t0, tasks[open_tasks[0]][0])
+
+    schedule = (starts, assign_resources(tasks, starts, resources))
+    if schedule[1] is None or schedule_error(tasks, *schedule, resources) is not None:
+        return None, None, None, history
+    return "SAT", "rolling-horizon search", schedule, history
@@ -12,4 +12,8 @@
 # /home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved.py large
 /home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved.py huge
 # /home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved_pb.py huge
-/home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved_CaDiCal.py huge
\ No newline at end of file
+/home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved_CaDiCal.py huge
+# /home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_occupancy.py large
+# /home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_occupancy.py huge
+/home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_improved.py long_duration
+/home/hung1832001nb/SANPT/.venv/bin/python /home/hung1832001nb/SANPT/es3_disjunctive.py long_duration
\ No newline at end of file
@@ -0,0 +1,194 @@
+# Symmetry breaking shared by the es3 encoders.
+# Resources are identical, so every permutation of the resource indices of a
+# schedule is again a schedule. Value precedence keeps one representative:
+# walking the tasks in a fixed order, resource j may only be used once some
+# earlier task already uses resource j - 1.
+
+def compulsory_clique(tasks):
+    # Task i runs during [d_i - e_i, r_i + e_i) whatever its start time (its compulsory part).
+    # Tasks whose compulsory parts share a time point pairwise overlap, so they need distinct
+    # resources. Sweep the compulsory parts for the point covered most often and return the
+    # tasks covering it (in index order), SB1 pins them to resources 0..k-1
+    events = []
+    for i, (r, e, d) in enumerate(tasks):
+        if d - e < r + e:
+            events.append((d - e, 1))
+            events.append((r + e, -1))
+
+    # Parts are half-open, so at equal times the ends come before the starts
+    best, best_point, active = 0, None, 0
+    for point, delta in sorted(events):
+        active += delta
+        if active > best:
+            best, best_point = active, point
+
+    if best_point is None:
+        return []
+    return [i for i, (r, e, d) in enumerate(tasks) if d - e <= best_point < r + e]
+
+def value_precedence_order(tasks, fixed_tasks):
+    # Tasks pinned by SB1 come first (task at position j is pinned to resource j),
+    # the remaining tasks follow sorted by (r, e, d) so that identical tasks are adjacent
+    pinned = set(fixed_tasks)
+    rest = sorted((i for i in range(len(tasks)) if i not in pinned), key=lambda i: (tasks[i], i))
+    return list(fixed_tasks) + rest
+
+def value_precedence_bounds(order, resources):
+    # (i, j) pairs that value precedence fixes to 0: the task at position q may only use resources <= q.
+    # Used as plain variable fixings by the CP/MIP models
+    return [(i, j) for q, i in enumerate(order) for j in range(q + 1, resources)]
+
+def value_precedence_rows(order, resources):
+    # (i, j, earlier) triples of VP2 for the CP/MIP models: task i may only use resource j > 0 when
+    # some task of earlier, the tasks before i in the order, uses resource j - 1. As a linear
+    # constraint, u[i][j] <= sum of u[k][j-1] over k in earlier
+    return [(i, j, order[:q]) for q, i in enumerate(order) for j in range(1, min(q + 1, resources))]
+
+def value_precedence_clauses(order, uses, resources, top_id):
+    # uses(i, j) returns the literals whose conjunction means "task i uses resource j"
+    # (a single u[i][j] for the one-hot encoding). Returns the clauses and the last variable id used.
+    clauses = []
+
+    def new_var():
+        nonlocal top_id
+        top_id += 1
+        return top_id
+
+    def use_literal(i, j):
+        literals = uses(i, j)
+        if len(literals) == 1:
+            return literals[0]
+        # w -> every literal of the conjunction
+        w = new_var()
+        for lit in literals:
+            clauses.append([-w, lit])
+        clauses.append([w] + [-lit for lit in literals])
+        return w
+
+    # p[j] for the prefix before the current position: some task already uses resource j
+    prev = {}
+    for q, i in enumerate(order):
+        # VP1: the task at position q only uses resources <= q
+        for j in range(q + 1, resources):
+            clauses.append([-lit for lit in uses(i, j)])
+
+        current = {}
+        for j in range(min(q + 1, resources)):
+            lit = use_literal(i, j)
+
+            # VP2: task i uses resource j -> some earlier task uses resource j - 1
+            if j > 0:
+                clauses.append([-lit, prev[j - 1]])
+
+            # p_q[j] -> p_{q-1}[j] v task i uses resource j
+            if q < len(order) - 1 and j < resources - 1:
+                current[j] = new_var()
+                clauses.append([-current[j], lit] + ([prev[j]] if j in prev else []))
+        prev = current
+
+    return clauses, top_id
+
+# Tasks with identical (r, e, d) are interchangeable: any schedule can be permuted so that
+# such tasks start in index order, and tasks starting together use increasing resources.
+
+def identical_task_groups(tasks, fixed_tasks):
+    # Groups (in index order) of at least two tasks with identical (r, e, d), tasks pinned by SB1 excluded
+    pinned = set(fixed_tasks)
+    groups = {}
+    for i in range(len(tasks)):
+        if i not in pinned:
+            groups.setdefault(tuple(tasks[i]), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+def started_by_literals(tasks, groups, at, top_id):
+    # Order literals p[i][t] <-> S_i <= t for the grouped tasks, from at(i, t): a literal whose
+    # disjunction over [r_i, t] means task i started by t (z[i][t], or a start choice at t).
+    # Returns starts_by(i, t) giving the literal or True/False, the clauses and the last variable id used
+    clauses = []
+    p = {}
+    for group in groups:
+        for i in group:
+            r, e, d = tasks[i]
+            for t in range(r, d - e):
+                top_id += 1
+                p[i, t] = top_id
+                lits = [at(i, t)] if at(i, t) is not None else []
+                # p[i][t] <-> p[i][t-1] v at(i, t)
+                for lit in lits:
+                    clauses.append([-lit, p[i, t]])
+                if t > r:
+                    clauses.append([-p[i, t - 1], p[i, t]])
+                    clauses.append([-p[i, t], p[i, t - 1]] + lits)
+                else:
+                    clauses.append([-p[i, t]] + lits)
+
+    def starts_by(i, t):
+        if t < tasks[i][0]:
+            return False
+        if t >= tasks[i][2] - tasks[i][1]:
+            return True
+        return p[i, t]
+
+    return starts_by, clauses, top_id
+
+def identical_task_clauses(tasks, groups, starts_by, uses, resources, top_id, ties=None):
+    # For consecutive a < b of a group: S_a <= S_b, and S_a = S_b -> resource of a < resource of b.
+    # uses(i, j) is as in value_precedence_clauses, or None when resources are assigned after solving.
+    # Start encodings without order literals pass starts_by=None and ties[a, b], a literal implied
+    # by S_a = S_b, and add S_a <= S_b themselves. Returns the clauses and the last variable id used
+    clauses = []
+
+    def new_var():
+        nonlocal top_id
+        top_id += 1
+        return top_id
+
+    def use_literal(i, j):
+        literals = uses(i, j)
+        if len(literals) == 1:
+            return literals[0]
+        w = new_var()
+        for lit in literals:
+            clauses.append([-w, lit])
+        clauses.append([w] + [-lit for lit in literals])
+        return w
+
+    for group in groups:
+        r, e, d = tasks[group[0]]
+        for a, b in zip(group, group[1:]):
+            # L1: S_b <= t -> S_a <= t
+            if ties is None:
+                for t in range(r, d - e):
+                    clauses.append([-starts_by(b, t), starts_by(a, t)])
+
+            if uses is None:
+                continue
+
+            # L2: same start, tie on S_a = S_b = t is S_b <= t ^ -(S_a <= t-1) given L1
+            if ties is not None:
+                tie = ties[a, b]
+            else:
+                tie = new_var()
+                for t in range(r, d - e + 1):
+                    clause = [tie]
+                    if starts_by(b, t) is not True:
+                        clause.append(-starts_by(b, t))
+                    if starts_by(a, t - 1) is not False:
+                        clause.append(starts_by(a, t - 1))
+                    clauses.append(clause)
+
+            # q[j] -> task a uses some resource <= j
+            below = []
+            for j in range(resources - 1):
+                below.append(new_var())
+                clauses.append([-below[j], use_literal(a, j)] + ([below[j - 1]] if j > 0 else []))
+
+            # L3: tie ^ task b uses resource j -> task a uses a resource < j
+            for j in range(resources):
+                clauses.append([-tie, -use_literal(b, j)] + ([below[j - 1]] if j > 0 else []))
+
+    return clauses, top_id
+
+def identical_task_pairs(groups):
+    # Consecutive (a, b) pairs of every group, for the CP/MIP models: sum_t t * z[a][t] <= sum_t t * z[b][t]
+    return [(a, b) for group in groups for a, b in zip(group, group[1:])]